@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    反復回数を設定 `PASSWORD_HASH_ITERATIONS` で変更できる PBKDF2 (SHA256)。
+
+    Django 標準と同じ 'pbkdf2_sha256' 形式のため、既存のハッシュはそのまま確認できる。
+    保存されているハッシュの反復回数が設定と異なる場合は、ログイン時に設定の回数でハッシュし直す。
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -50,8 +50,16 @@ class Teacher(AbstractBaseUser, PermissionsMixin):
         self.password = make_password(password)
         
     def check_password(self, password):
-        """パスワードのチェック"""
-        return check_password(password, self.password)
+        """
+        パスワードのチェック
+
+        ハッシュの形式・反復回数が設定（PASSWORD_HASHERS・PASSWORD_HASH_ITERATIONS）と異なる場合は、
+        正しいパスワードで現在の設定のハッシュに更新する。
+        """
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self.save(update_fields=['password'])
+        return check_password(password, self.password, setter)
     
     def __str__(self):
         return f"{self.teacher_id} ({self.teacher_name})"
\ No newline at end of file
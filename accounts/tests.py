@@ -1,3 +1,90 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .models import Teacher
+
+
+@override_settings(
+    PASSWORD_HASH_ITERATIONS=1000,
+    LOGIN_THROTTLE_IP_BURST=3, LOGIN_THROTTLE_IP_PER_MINUTE=1,
+    LOGIN_THROTTLE_TEACHER_BURST=2, LOGIN_THROTTLE_TEACHER_PER_MINUTE=1,
+)
+class TeacherLoginViewTests(TestCase):
+    """ログイン（制限・パスワードのハッシュの更新）のテスト"""
+
+    def setUp(self):
+        caches[settings.LOGIN_THROTTLE_CACHE].clear()
+        self.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', teacher_name='長野')
+
+    def login(self, teacher_id=1, password='pass', ip='10.0.0.1'):
+        return self.client.post(
+            reverse('accounts:login'), {'teacher_id': teacher_id, 'password': password}, REMOTE_ADDR=ip
+        )
+
+    def test_login(self):
+        self.assertRedirects(self.login(), reverse('students:index'), fetch_redirect_response=False)
+
+    def test_teacher_is_throttled_before_password_check(self):
+        self.assertContains(self.login(password='wrong'), 'パスワードが間違っています。')
+        # 教師番号の表記が違っても同じ教師として数える
+        self.assertContains(self.login(teacher_id='01', password='wrong', ip='10.0.0.2'), 'パスワードが間違っています。')
+
+        # 制限を超えた試行では、教師の取得もパスワードの確認もしない
+        with self.assertNumQueries(0):
+            response = self.login(ip='10.0.0.3')
+        self.assertContains(response, 'ログインの試行回数が多すぎます。', status_code=429)
+        self.assertEqual(response['Retry-After'], '60')
+
+        # 他の教師は制限されない
+        Teacher.objects.create_user(teacher_id=2, password='pass')
+        self.assertEqual(self.login(teacher_id=2, ip='10.0.0.4').status_code, 302)
+
+    def test_ip_is_throttled(self):
+        for teacher_id in (101, 102, 103):
+            self.assertContains(self.login(teacher_id=teacher_id), '教師IDが間違っています。')
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(ip='10.0.0.2').status_code, 302)
+
+    def test_password_is_rehashed_when_iterations_change(self):
+        self.assertTrue(self.teacher.password.startswith('pbkdf2_sha256$1000$'))
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            # 間違ったパスワードではハッシュを更新しない
+            self.login(password='wrong')
+            self.teacher.refresh_from_db()
+            self.assertTrue(self.teacher.password.startswith('pbkdf2_sha256$1000$'))
+
+            self.assertEqual(self.login().status_code, 302)
+            self.teacher.refresh_from_db()
+            self.assertTrue(self.teacher.password.startswith('pbkdf2_sha256$2000$'))
+            self.assertTrue(self.teacher.check_password('pass'))
+
+    @override_settings(LOGIN_THROTTLE_PROXY_COUNT=1)
+    def test_ip_behind_proxy_ignores_spoofed_forwarded_for(self):
+        def login(teacher_id, forwarded_for):
+            return self.client.post(
+                reverse('accounts:login'), {'teacher_id': teacher_id, 'password': 'pass'},
+                REMOTE_ADDR='192.168.0.1', HTTP_X_FORWARDED_FOR=forwarded_for,
+            )
+
+        # 左側（クライアントが送った値）を変えても、プロキシが追加したアドレスで数える
+        for teacher_id, spoofed in ((101, '1.1.1.1'), (102, '2.2.2.2'), (103, '3.3.3.3')):
+            self.assertContains(login(teacher_id, f'{spoofed}, 10.0.0.1'), '教師IDが間違っています。')
+        self.assertEqual(login(1, '4.4.4.4, 10.0.0.1').status_code, 429)
+        self.assertEqual(login(1, '10.0.0.1, 10.0.0.2').status_code, 302)
+
+    @override_settings(LOGIN_THROTTLE_PROXY_COUNT=2)
+    def test_ip_behind_app_engine_uses_client_address(self):
+        # App Engine では「クライアント, ロードバランサー」の順になり、REMOTE_ADDR は全員同じ
+        def login(teacher_id, client):
+            return self.client.post(
+                reverse('accounts:login'), {'teacher_id': teacher_id, 'password': 'pass'},
+                REMOTE_ADDR='169.254.1.1', HTTP_X_FORWARDED_FOR=f'{client}, 35.191.0.1',
+            )
+
+        for teacher_id in (101, 102, 103):
+            self.assertContains(login(teacher_id, '1.1.1.1'), '教師IDが間違っています。')
+        self.assertEqual(login(1, '1.1.1.1').status_code, 429)
+        # 別のIPアドレスからは制限されない
+        self.assertEqual(login(1, '2.2.2.2').status_code, 302)
@@ -0,0 +1,83 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class TokenBucket:
+    """
+    キャッシュに状態を保存するトークンバケット。
+
+    `capacity` 回までは続けて試行でき、その後は1分あたり `per_minute` 回ずつ試行できる回数が回復します。
+    キャッシュの読み書きはアトミックではないため、同時に試行した場合は数回多く通すことがあります。
+    """
+
+    def __init__(self, scope, capacity, per_minute):
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = per_minute / 60
+
+    def cache_key(self, ident):
+        return f'login-throttle:{self.scope}:{ident}'
+
+    def take(self, ident):
+        """
+        トークンを1つ使う。
+
+        Returns:
+            float: トークンが残っていない場合は、次のトークンが回復するまでの秒数。使えた場合は 0。
+        """
+        cache = caches[settings.LOGIN_THROTTLE_CACHE]
+        key = self.cache_key(ident)
+        now = time.time()
+        tokens, updated = cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        # 満タンに戻るまでの時間だけ保存する（それ以降は保存していない状態と同じ）
+        cache.set(key, (tokens - 1, now), math.ceil(self.capacity / self.rate))
+        return 0
+
+
+def client_ip(request):
+    """
+    制限に使うクライアントのIPアドレス。
+
+    設定 `LOGIN_THROTTLE_PROXY_COUNT` が 0 の場合は REMOTE_ADDR を使う。
+    信頼するプロキシの数を指定した場合は、X-Forwarded-For の右からその数番目
+    （最も外側の信頼するプロキシが追加したアドレス）を使う。それより左はクライアントが自由に送れるため使わない。
+    """
+    proxy_count = settings.LOGIN_THROTTLE_PROXY_COUNT
+    if proxy_count:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        if len(forwarded) >= proxy_count and forwarded[-proxy_count]:
+            return forwarded[-proxy_count]
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def throttle_login(request, teacher_id):
+    """
+    ログインの試行を、IPアドレスごと・教師番号ごとのトークンバケットで制限する。
+
+    パスワードのハッシュ計算の前に呼び出し、制限を超えた試行では計算をしない。
+
+    Returns:
+        int: 制限を超えた場合は再試行できるまでの秒数（Retry-After）。超えていない場合は 0。
+    """
+    try:
+        # '1' と '01' は同じ教師のため、数値にそろえる
+        teacher_id = int(teacher_id)
+    except ValueError:
+        pass
+    buckets = (
+        (TokenBucket('ip', settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE),
+         client_ip(request)),
+        (TokenBucket('teacher', settings.LOGIN_THROTTLE_TEACHER_BURST, settings.LOGIN_THROTTLE_TEACHER_PER_MINUTE),
+         teacher_id),
+    )
+    for bucket, ident in buckets:
+        retry_after = bucket.take(ident)
+        if retry_after:
+            return math.ceil(retry_after)
+    return 0
@@ -3,6 +3,7 @@ from django.contrib.auth import authenticate, login
 from django.contrib import messages
 from .forms import TeacherLoginForm
 from .models import Teacher
+from .throttle import throttle_login
 
 
 def TeacherLoginView(request):
@@ -12,6 +13,14 @@ def TeacherLoginView(request):
             teacher_id = form.cleaned_data['teacher_id']
             password = form.cleaned_data['password']
 
+            # 試行回数が多すぎる場合は、教師の取得・パスワードのハッシュ計算をせずに断る
+            retry_after = throttle_login(request, teacher_id)
+            if retry_after:
+                messages.error(request, f'ログインの試行回数が多すぎます。{retry_after}秒後に再度お試しください。')
+                response = render(request, 'accounts/login.html', {'form': form}, status=429)
+                response['Retry-After'] = str(retry_after)
+                return response
+
             # teacher_idを基に教師を認証
             try:
                 teacher = Teacher.objects.get(teacher_id=teacher_id)
@@ -27,4 +36,3 @@ def TeacherLoginView(request):
         form = TeacherLoginForm()
 
     return render(request, 'accounts/login.html', {'form': form})
-
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Teacher
+from attendance.models import Attendance
+from students.models import Course, Score, Student, Subject
+
+
+# Create your tests here.
+class ApiListViewTests(TestCase):
+    """読み取り専用JSON APIのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', teacher_name='長野')
+        cls.course = Course.objects.create(class_id='101', course_name='システム開発コース', teacher_id=cls.teacher)
+        other = Course.objects.create(class_id='102', course_name='情報処理コース')
+        cls.students = Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024,
+                    class_id=cls.course if i <= 5 else other)
+            for i in range(1, 8)
+        ])
+        subject = Subject.objects.create(subject_id='A01', subject_name='数学')
+        Score.objects.bulk_create([Score(student_id=student, subject_id=subject, score=70) for student in cls.students])
+        Attendance.objects.bulk_create([
+            Attendance(student_id=cls.students[0], attendance_date='2024-12-05', attendance_id=1),
+            Attendance(student_id=cls.students[0], attendance_date='2025-01-10', attendance_id=2),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+
+    def get(self, resource, **params):
+        return self.client.get(reverse('api:api_list', args=(resource,)), params)
+
+    def test_filters_and_sparse_fields(self):
+        response = self.get('students', year='2024', **{'class': '101', 'fields': 'student_id,last_name'})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0], {'student_id': '0000000001', 'last_name': '長野'})
+
+        self.assertEqual(self.get('courses').json()['results'][0]['teacher_name'], '長野')
+        self.assertEqual(
+            self.get('attendance', **{'from': '2025-01-01', 'fields': 'attendance_date'}).json()['results'],
+            [{'attendance_date': '2025-01-10'}],
+        )
+
+    def test_keyset_pagination_walks_every_row_once(self):
+        seen = []
+        response = self.get('scores', limit='3', fields='student_id')
+        while True:
+            body = response.json()
+            seen += [row['student_id'] for row in body['results']]
+            if not body['next']:
+                break
+            response = self.client.get(body['next'])
+
+        self.assertEqual(seen, [student.student_id for student in self.students])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get('students', fields='password').status_code, 400)
+        self.assertEqual(self.get('students', year='abc').status_code, 400)
+        self.assertEqual(self.get('attendance', date='2024-13-01').status_code, 400)
+        self.assertEqual(self.get('teachers').status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.get('students').status_code, 401)
+
+    def test_etag_returns_304_without_query_until_data_changes(self):
+        response = self.get('students', year='2024')
+        etag = response['ETag']
+
+        # 教師の取得だけで、学生の一覧は取得しない
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('api:api_list', args=('students',)), {'year': '2024'}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+        # 別の絞り込み条件は別のETag
+        self.assertNotEqual(self.get('students', year='2025')['ETag'], etag)
+
+        student = self.students[0]
+        student.last_name = '松本'
+        student.save()
+        response = self.client.get(
+            reverse('api:api_list', args=('students',)), {'year': '2024'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['last_name'], '松本')
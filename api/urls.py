@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('<str:resource>/', views.ApiListView, name='api_list'),
+]
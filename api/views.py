@@ -0,0 +1,206 @@
+import hashlib
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from accounts.models import Teacher
+from attendance.models import Attendance
+from students.models import Course, Score, Student, Subject
+from students.reference import get_version
+
+# 1ページあたりの件数（limit パラメータの既定値と上限）
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+
+class Resource:
+    """
+    APIで公開するデータの定義。
+
+    引数:
+        queryset: 取得元のクエリセット
+        key (str): 並び順とキーセットページングに使う一意な項目
+        fields (dict): 公開する項目名とモデルの項目（`values()` に渡す名前）の対応
+        filters (dict): GETパラメータ名と絞り込み条件（`filter()` に渡す名前）の対応
+        models (tuple): データの元になるモデル（いずれかが更新されるとETagが変わる）
+    """
+
+    def __init__(self, queryset, key, fields, filters, models):
+        self.queryset = queryset
+        self.key = key
+        self.fields = fields
+        self.filters = filters
+        self.models = models
+
+
+RESOURCES = {
+    'courses': Resource(
+        Course.objects.all(),
+        key='class_id',
+        fields={
+            'class_id': 'class_id',
+            'course_name': 'course_name',
+            'teacher_id': 'teacher_id',
+            'teacher_name': 'teacher_id__teacher_name',
+        },
+        filters={},
+        models=(Course, Teacher),
+    ),
+    'students': Resource(
+        Student.objects.all(),
+        key='student_id',
+        fields={
+            'student_id': 'student_id',
+            'last_name': 'last_name',
+            'first_name': 'first_name',
+            'postalcode': 'postalcode',
+            'address1': 'address1',
+            'address2': 'address2',
+            'phone_number': 'phone_number',
+            'ent_year': 'ent_year',
+            'class_id': 'class_id',
+            'absence_day': 'absence_day',
+            'attend_flag': 'attend_flag',
+        },
+        filters={'year': 'ent_year', 'class': 'class_id'},
+        models=(Student,),
+    ),
+    'scores': Resource(
+        Score.objects.all(),
+        key='id',
+        fields={
+            'id': 'id',
+            'student_id': 'student_id',
+            'subject_id': 'subject_id',
+            'subject_name': 'subject_id__subject_name',
+            'score': 'score',
+        },
+        filters={'year': 'student_id__ent_year', 'class': 'student_id__class_id', 'subject': 'subject_id'},
+        models=(Score, Student, Subject),
+    ),
+    'attendance': Resource(
+        Attendance.objects.all(),
+        key='id',
+        fields={
+            'id': 'id',
+            'student_id': 'student_id',
+            'attendance_date': 'attendance_date',
+            'attendance_id': 'attendance_id',
+        },
+        filters={
+            'year': 'student_id__ent_year',
+            'class': 'student_id__class_id',
+            'date': 'attendance_date',
+            'from': 'attendance_date__gte',
+            'to': 'attendance_date__lte',
+        },
+        models=(Attendance, Student),
+    ),
+}
+
+
+class ApiError(Exception):
+    """リクエストの誤り（400 Bad Request として返す）"""
+
+
+def api_login_required(view):
+    """ログインしていない場合は、ログイン画面へのリダイレクトではなく401をJSONで返す"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'ログインが必要です。'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def resource_etag(request, resource):
+    """
+    データのバージョンとクエリ文字列からETagを作成する。
+
+    バージョンは全てのワーカーで共有するキャッシュから取得するため、データベースに問い合わせずに
+    前回から（他のワーカーでの変更も含めて）変更があったかどうかを判定できます。
+    """
+    definition = RESOURCES.get(resource)
+    if definition is None:
+        return None
+    versions = ':'.join(str(get_version(model)) for model in definition.models)
+    query = '&'.join(sorted(f'{key}={value}' for key, value in request.GET.items()))
+    return hashlib.md5(f'{resource}:{versions}:{query}'.encode('utf-8')).hexdigest()
+
+
+def build_queryset(definition, params):
+    """GETパラメータから、絞り込み・項目選択・ページングしたクエリセットと項目名を作成する"""
+    fields = params.get('fields')
+    names = fields.split(',') if fields else list(definition.fields)
+    unknown = [name for name in names if name not in definition.fields]
+    if unknown:
+        raise ApiError(f"fields に指定できない項目があります: {', '.join(unknown)}")
+
+    try:
+        limit = min(int(params.get('limit', API_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError('limit は整数で指定してください。')
+    if limit < 1:
+        raise ApiError('limit は1以上で指定してください。')
+
+    queryset = definition.queryset
+    try:
+        for param, lookup in definition.filters.items():
+            if params.get(param):
+                queryset = queryset.filter(**{lookup: params[param]})
+        if params.get('after'):
+            queryset = queryset.filter(**{f'{definition.key}__gt': params['after']})
+    except (ValueError, ValidationError):
+        raise ApiError('絞り込み条件の形式が正しくありません。')
+
+    # キーセットページングのため、キーは指定がなくても取得する
+    columns = [definition.fields[name] for name in names]
+    if definition.key not in columns:
+        columns.append(definition.key)
+    queryset = queryset.order_by(definition.key).values(*columns)[:limit + 1]
+    return queryset, names, limit
+
+
+@require_GET
+@api_login_required
+@condition(etag_func=resource_etag)
+def ApiListView(request, resource):
+    """
+    読み取り専用のJSON API。
+
+    `courses`, `students`, `scores`, `attendance` の一覧を、キーの順に返します。
+    データが前回の取得から変わっていなければ、`If-None-Match` に対して
+    データベースに問い合わせずに 304 Not Modified を返します。
+
+    GETパラメータ:
+        - year, class, subject, date, from, to: 検索画面と同じ絞り込み条件（データの種類により異なる）
+        - fields: 返す項目（カンマ区切り、省略時は全項目）
+        - limit: 1ページの件数（既定100、最大1000）
+        - after: このキーより後のデータを返す（レスポンスの `next` に含まれる）
+
+    レスポンス:
+        {"results": [...], "next": 次のページのURL（最後のページの場合は null）}
+    """
+    definition = RESOURCES.get(resource)
+    if definition is None:
+        return JsonResponse({'error': f'{resource} は存在しません。'}, status=404)
+    try:
+        queryset, names, limit = build_queryset(definition, request.GET)
+        rows = list(queryset)
+    except ApiError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params['after'] = rows[-1][definition.key]
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+    results = [{name: row[definition.fields[name]] for name in names} for row in rows]
+    response = JsonResponse({'results': results, 'next': next_url}, json_dumps_params={'ensure_ascii': False})
+    # 毎回ETagで再検証させる（ログインユーザーごとの応答のため共有キャッシュには保存させない）
+    response['Cache-Control'] = 'private, no-cache'
+    return response
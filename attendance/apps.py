@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
+
+    def ready(self):
+        # 出欠席の訂正・削除を月別集計に反映するシグナルを登録
+        from . import signals  # noqa: F401
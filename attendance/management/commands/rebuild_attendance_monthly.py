@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from attendance.models import rebuild_monthly_attendance
+
+
+class Command(BaseCommand):
+    """
+    月別出欠席集計（AttendanceMonthly）を出欠席データから作り直すコマンド。
+
+    通常は出欠席の登録・訂正のたびに集計が更新されるため不要ですが、
+    SQLで直接出欠席データを変更した場合や、集計の不整合が疑われる場合に実行します。
+    作り直しは1つのトランザクション内で行うため、途中の状態が月別レポートに表示されることはありません。
+
+    使用例:
+        python manage.py rebuild_attendance_monthly
+    """
+    help = '月別出欠席集計を出欠席データから作り直します。'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            count = rebuild_monthly_attendance()
+        self.stdout.write(f'月別集計: {count}件 ({time.perf_counter() - started:.2f}秒)')
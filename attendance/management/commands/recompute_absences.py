@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from attendance.models import recompute_absence_days
+
+
+class Command(BaseCommand):
+    """
+    全学生の欠席累計（absence_day）を出欠席データから計算し直すコマンド。
+
+    欠席は1.0、遅刻・早退は0.5、その他は0.0として出欠席データを集計し、
+    保存されている欠席累計とずれていた学生を、学生番号と更新前後の値で表示します。
+
+    使用例:
+        python manage.py recompute_absences
+        python manage.py recompute_absences --dry-run
+    """
+    help = '全学生の欠席累計を出欠席データから計算し直します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='ずれの表示のみ行い、更新しない')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            drift = recompute_absence_days()
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        for student_id, previous, total in drift:
+            self.stderr.write(f'{student_id}: {previous} -> {total}')
+        label = 'ずれ' if options['dry_run'] else '修正'
+        self.stdout.write(f'{label}: {len(drift)}件 ({time.perf_counter() - started:.2f}秒)')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student_id', 'attendance_date'], name='attendance_student_date_idx'),
+        ),
+    ]
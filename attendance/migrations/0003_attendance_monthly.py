@@ -0,0 +1,44 @@
+# Generated by Django 4.2.17 on 2026-10-18 13:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_student_id_sequence'),
+        ('attendance', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='年')),
+                ('month', models.IntegerField(verbose_name='月')),
+                ('attendance_id', models.IntegerField(verbose_name='分類(1:欠席, 2: 遅刻, 3:早退, 4:その他)')),
+                ('count', models.IntegerField(default=0, verbose_name='件数')),
+                ('student_id', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='students.student', verbose_name='学生番号')),
+            ],
+            options={
+                'verbose_name_plural': 'AttendanceMonthly',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancemonthly',
+            constraint=models.UniqueConstraint(fields=('student_id', 'year', 'month', 'attendance_id'), name='unique_attendance_monthly'),
+        ),
+        # 既存の出欠席データから月別集計を作成する
+        migrations.RunSQL(
+            sql=(
+                'INSERT INTO attendance_attendancemonthly (student_id_id, year, month, attendance_id, count) '
+                'SELECT student_id_id, EXTRACT(YEAR FROM attendance_date), EXTRACT(MONTH FROM attendance_date), '
+                'attendance_id, COUNT(*) FROM attendance_attendance '
+                'WHERE attendance_date IS NOT NULL AND attendance_id IS NOT NULL '
+                'GROUP BY 1, 2, 3, 4'
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
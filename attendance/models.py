@@ -1,5 +1,26 @@
-from django.db import models
+import datetime
+from collections import Counter
+from decimal import Decimal
+from django.db import connection, models
+from django.db.models import Case, DecimalField, F, Value, When
 from students.models import Student
+from students.reference import invalidate
+
+# 出欠席分類（キー：分類ID, 値：分類名）
+ATTENDANCE_CATEGORIES = {
+    1: "欠席",
+    2: "遅刻",
+    3: "早退",
+    4: "その他"
+}
+
+# 出欠席分類ごとの欠席累計への加算値（1:欠席, 2:遅刻, 3:早退）
+ABSENCE_WEIGHTS = {
+    1: Decimal('1.0'),
+    2: Decimal('0.5'),
+    3: Decimal('0.5'),
+}
+
 # Create your models here.
 class Attendance(models.Model):
     """出欠席モデル
@@ -11,6 +32,168 @@ class Attendance(models.Model):
 
     class Meta:
         verbose_name_plural = 'Attendance'
+        indexes = [
+            # 学生ごと・日付ごとの出欠参照に対応
+            models.Index(fields=['student_id', 'attendance_date'], name='attendance_student_date_idx'),
+        ]
     
     def __str__(self):
-        return f'{self.student_id.student_id} - {self.attendance_date}'
\ No newline at end of file
+        return f'{self.student_id_id} - {self.attendance_date}'
+
+
+class AttendanceMonthly(models.Model):
+    """月別出欠席集計モデル
+        学生・年・月・分類ごとの出欠席の件数を管理するテーブル
+        （`Attendance` から作成する集計で、月別のレポートはこのテーブルだけを参照する）
+    """
+    # 集計値のため、学生を削除した場合は一緒に削除する
+    # 学生番号での検索は一意制約のインデックス（学生番号が先頭）を使うため、外部キー単独のインデックスは作らない
+    student_id = models.ForeignKey(Student, verbose_name='学生番号', on_delete=models.CASCADE, db_index=False)
+    year = models.IntegerField(verbose_name='年')
+    month = models.IntegerField(verbose_name='月')
+    attendance_id = models.IntegerField(verbose_name='分類(1:欠席, 2: 遅刻, 3:早退, 4:その他)')
+    count = models.IntegerField(verbose_name='件数', default=0)
+
+    class Meta:
+        verbose_name_plural = 'AttendanceMonthly'
+        constraints = [
+            # 学生・年・月・分類ごとに1件（加算時の競合キー）
+            models.UniqueConstraint(
+                fields=['student_id', 'year', 'month', 'attendance_id'], name='unique_attendance_monthly'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.student_id_id} - {self.year}/{self.month} - {self.attendance_id}'
+
+
+# 月別集計の加算で、1回のINSERTで扱う件数
+MONTHLY_BATCH_SIZE = 1000
+
+
+def add_monthly_attendance(attendances, sign=1):
+    """
+    出欠席データを月別集計（`AttendanceMonthly`）に加算する。
+
+    学生・年・月・分類ごとに件数をまとめ、`INSERT ... ON CONFLICT DO UPDATE` で既存の件数に加算するため、
+    同時に登録しても件数が失われません。出欠席を取り消した場合は `sign=-1` で減算します。
+
+    引数:
+        attendances: `Attendance` インスタンスの並び（`attendance_date` は日付または 'YYYY-MM-DD' の文字列）
+        sign (int): 1 で加算、-1 で減算
+    """
+    counts = Counter()
+    for attendance in attendances:
+        day = attendance.attendance_date
+        if not day or attendance.attendance_id is None:
+            continue
+        if isinstance(day, str):
+            day = datetime.date.fromisoformat(day)
+        counts[(attendance.student_id_id, day.year, day.month, int(attendance.attendance_id))] += sign
+    rows = [key + (count,) for key, count in counts.items() if count]
+
+    table = connection.ops.quote_name(AttendanceMonthly._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), MONTHLY_BATCH_SIZE):
+            batch = rows[start:start + MONTHLY_BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} (student_id_id, year, month, attendance_id, count) VALUES '
+                + ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))
+                + ' ON CONFLICT (student_id_id, year, month, attendance_id)'
+                f' DO UPDATE SET count = {table}.count + EXCLUDED.count',
+                [value for row in batch for value in row],
+            )
+
+
+def rebuild_monthly_attendance():
+    """
+    月別集計（`AttendanceMonthly`）を全ての出欠席データから作り直す。
+
+    集計はデータベース内の1回の `INSERT ... SELECT ... GROUP BY` で行い、
+    作り直した後は統計情報を更新して、月別レポートが一意制約のインデックスを使うようにします。
+
+    戻り値:
+        int: 作成した集計の件数
+    """
+    monthly = connection.ops.quote_name(AttendanceMonthly._meta.db_table)
+    attendance = connection.ops.quote_name(Attendance._meta.db_table)
+    with connection.cursor() as cursor:
+        # 同じトランザクション内の保留中の制約チェックを済ませてから、TRUNCATEで全件削除する
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'TRUNCATE {monthly}')
+        cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+        cursor.execute(
+            f'INSERT INTO {monthly} (student_id_id, year, month, attendance_id, count) '
+            'SELECT student_id_id, EXTRACT(YEAR FROM attendance_date), EXTRACT(MONTH FROM attendance_date), '
+            f'attendance_id, COUNT(*) FROM {attendance} '
+            'WHERE attendance_date IS NOT NULL AND attendance_id IS NOT NULL '
+            'GROUP BY 1, 2, 3, 4'
+        )
+        count = cursor.rowcount
+        cursor.execute(f'ANALYZE {monthly}')
+        return count
+
+
+def add_absence_days(categories):
+    """
+    出欠席分類から学生ごとの欠席累計を計算し、F()式を使った1回のUPDATEでまとめて加算する。
+
+    引数:
+        categories: (学生番号, 出欠席分類) の組の並び。同じ学生が複数回含まれてもよい。
+    """
+    totals = {}
+    for student_id, category in categories:
+        day = ABSENCE_WEIGHTS.get(int(category))
+        if day is not None:
+            totals[student_id] = totals.get(student_id, Decimal('0.0')) + day
+    if not totals:
+        return
+
+    # 加算値ごとに学生をまとめ、CASE式の分岐数を学生数ではなく加算値の種類数に抑える
+    students_by_day = {}
+    for student_id, day in totals.items():
+        students_by_day.setdefault(day, []).append(student_id)
+    Student.objects.filter(student_id__in=list(totals)).update(
+        absence_day=F('absence_day') + Case(
+            *[When(student_id__in=ids, then=Value(day)) for day, ids in students_by_day.items()],
+            default=Value(Decimal('0.0')),
+            output_field=DecimalField(max_digits=5, decimal_places=1),
+        )
+    )
+    invalidate(Student)
+
+
+def recompute_absence_days():
+    """
+    全学生の欠席累計（`absence_day`）を出欠席データから計算し直し、ずれていた学生だけを更新する。
+
+    出欠席分類ごとの加算値（`ABSENCE_WEIGHTS`）による集計を1回の `GROUP BY` で行い、
+    集計・比較・更新を1回のUPDATE文で実行します。
+    実行中に出欠席が登録されて加算が失われないよう、出欠席テーブルを共有ロックしてから計算します。
+    トランザクション内で呼び出してください。
+
+    戻り値:
+        list: ずれていた学生の (学生番号, 更新前の欠席累計, 更新後の欠席累計) のリスト（学生番号順）
+    """
+    student = connection.ops.quote_name(Student._meta.db_table)
+    attendance = connection.ops.quote_name(Attendance._meta.db_table)
+    weights = ' '.join(f'WHEN {category} THEN {day}' for category, day in ABSENCE_WEIGHTS.items())
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {attendance} IN SHARE MODE')
+        cursor.execute(
+            f'WITH totals AS ('
+            f'  SELECT student_id_id, SUM(CASE attendance_id {weights} ELSE 0 END) AS total'
+            f'  FROM {attendance} GROUP BY student_id_id'
+            f'), drift AS ('
+            f'  SELECT s.student_id, s.absence_day AS previous, COALESCE(t.total, 0) AS total'
+            f'  FROM {student} s LEFT JOIN totals t ON t.student_id_id = s.student_id'
+            f'  WHERE s.absence_day <> COALESCE(t.total, 0)'
+            f') '
+            f'UPDATE {student} s SET absence_day = drift.total FROM drift '
+            f'WHERE s.student_id = drift.student_id '
+            f'RETURNING s.student_id, drift.previous, s.absence_day'
+        )
+        drift = sorted(cursor.fetchall())
+    if drift:
+        invalidate(Student)
+    return drift
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from students.reference import invalidate
+from .models import Attendance, add_monthly_attendance
+
+
+@receiver(pre_save, sender=Attendance)
+def subtract_previous_attendance(sender, instance, raw=False, **kwargs):
+    """出欠席を訂正する場合は、訂正前の内容を月別集計から減算する"""
+    if raw or instance.pk is None:
+        return
+    previous = Attendance.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        add_monthly_attendance([previous], sign=-1)
+
+
+@receiver(post_save, sender=Attendance)
+def add_saved_attendance(sender, instance, raw=False, **kwargs):
+    """1件ずつ登録・訂正した出欠席を月別集計に加算する（`bulk_create` の場合は呼び出し側で加算する）"""
+    if not raw:
+        add_monthly_attendance([instance])
+        invalidate(Attendance)
+
+
+@receiver(post_delete, sender=Attendance)
+def subtract_deleted_attendance(sender, instance, **kwargs):
+    """削除した出欠席を月別集計から減算する"""
+    add_monthly_attendance([instance], sign=-1)
+    invalidate(Attendance)
@@ -1,3 +1,307 @@
-from django.test import TestCase
+import io
+import threading
+from decimal import Decimal
+
+from django.db import connection, connections
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from django.core.management import call_command
+
+from accounts.models import Teacher
+from students.models import Course, Student
+from .models import Attendance, AttendanceMonthly, rebuild_monthly_attendance
 
 # Create your tests here.
+class AttendanceInsertViewTests(TestCase):
+    """出欠席登録ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        cls.course = Course.objects.create(class_id='101', course_name='システム開発コース')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def create_students(self, count, start=1):
+        return Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024, class_id=self.course)
+            for i in range(start, start + count)
+        ])
+
+    def post_roll_call(self, students, category='1', select_day='2024-12-05'):
+        data = {'select_day': select_day}
+        data.update({f'at_id_{student.student_id}': category for student in students})
+        return self.client.post(reverse('attendance:at_insert'), data)
+
+    def test_insert_creates_attendance_and_updates_absence_day(self):
+        absent, late, present = self.create_students(3)
+        response = self.client.post(reverse('attendance:at_insert'), {
+            'select_day': '2024-12-05',
+            f'at_id_{absent.student_id}': '1',
+            f'at_id_{late.student_id}': '2',
+            f'at_id_{present.student_id}': '0',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assertEqual(Student.objects.get(pk=absent.pk).absence_day, Decimal('1.0'))
+        self.assertEqual(Student.objects.get(pk=late.pk).absence_day, Decimal('0.5'))
+        self.assertEqual(Student.objects.get(pk=present.pk).absence_day, Decimal('0.0'))
+        self.assertEqual(len(response.context['students']), 3)
+
+    def test_duplicate_submission_is_counted_once(self):
+        absent, late = self.create_students(2)
+        data = {'select_day': '2024-12-05', f'at_id_{absent.student_id}': '1', f'at_id_{late.student_id}': '2'}
+        self.client.post(reverse('attendance:at_insert'), data)
+        self.client.post(reverse('attendance:at_insert'), data)
+        # 同じ日でも分類が違えば登録する（遅刻した学生の早退）
+        self.client.post(reverse('attendance:at_insert'), {'select_day': '2024-12-05', f'at_id_{late.student_id}': '3'})
+
+        self.assertEqual(Attendance.objects.count(), 3)
+        self.assertEqual(Student.objects.get(pk=absent.pk).absence_day, Decimal('1.0'))
+        self.assertEqual(Student.objects.get(pk=late.pk).absence_day, Decimal('1.0'))
+
+    def test_unknown_student_returns_404_and_writes_nothing(self):
+        students = self.create_students(2)
+        data = {'select_day': '2024-12-05', 'at_id_9999999999': '1'}
+        data.update({f'at_id_{student.student_id}': '1' for student in students})
+        response = self.client.post(reverse('attendance:at_insert'), data)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Attendance.objects.exists())
+        self.assertFalse(Student.objects.exclude(absence_day=Decimal('0.0')).exists())
+
+    def test_query_count_is_flat_as_class_grows(self):
+        """10人でも500人でも登録処理のクエリ数が変わらないこと"""
+        query_counts = []
+        start = 1
+        for size in (10, 100, 500):
+            students = self.create_students(size, start=start)
+            start += size
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_roll_call(students)
+            self.assertEqual(response.status_code, 200)
+            query_counts.append(len(queries))
+
+        self.assertEqual(len(set(query_counts)), 1, query_counts)
+        self.assertEqual(Attendance.objects.count(), 610)
+
+
+class AttendanceExportViewTests(TestCase):
+    """出欠席CSV出力ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        student = Student.objects.create(student_id='0000000001', last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+        Attendance.objects.create(student_id=student, attendance_date='2024-04-10', attendance_id=1)
+        Attendance.objects.create(student_id=student, attendance_date='2025-04-10', attendance_id=2)
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_streams_attendance_in_date_range(self):
+        response = self.client.get(reverse('attendance:at_export'), {
+            'class': '101', 'from': '2024-04-01', 'to': '2025-03-31',
+        })
+
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[1:], ['0000000001,長野,太郎,101,2024-04-10,欠席'])
+
+    def test_bad_filters_are_rejected(self):
+        for params in ({'from': '2024-13-01'}, {'to': 'yesterday'}, {'year': '二〇二四'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('attendance:at_export'), params).status_code, 400)
+
+
+def monthly_counts():
+    return {
+        (student_id, year, month, category): count
+        for student_id, year, month, category, count in AttendanceMonthly.objects.filter(count__gt=0).values_list(
+            'student_id', 'year', 'month', 'attendance_id', 'count'
+        )
+    }
+
+
+class AttendanceMonthlyTests(TestCase):
+    """月別出欠席集計と月別レポートのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        cls.course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        cls.students = Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024, class_id=cls.course)
+            for i in (1, 2)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_insert_view_updates_rollup_incrementally(self):
+        first, second = self.students
+        for day in ('2024-12-05', '2024-12-06'):
+            self.client.post(reverse('attendance:at_insert'), {
+                'select_day': day, f'at_id_{first.student_id}': '1', f'at_id_{second.student_id}': '2',
+            })
+
+        self.assertEqual(monthly_counts(), {
+            (first.student_id, 2024, 12, 1): 2,
+            (second.student_id, 2024, 12, 2): 2,
+        })
+
+    def test_correction_and_delete_move_counts(self):
+        attendance = Attendance.objects.create(student_id=self.students[0], attendance_date='2024-12-05', attendance_id=1)
+        attendance.attendance_id = 2
+        attendance.attendance_date = '2025-01-10'
+        attendance.save()
+        self.assertEqual(monthly_counts(), {(self.students[0].student_id, 2025, 1, 2): 1})
+
+        attendance.delete()
+        self.assertEqual(monthly_counts(), {})
+
+    def test_rebuild_matches_incremental_rollup(self):
+        Attendance.objects.create(student_id=self.students[0], attendance_date='2024-12-05', attendance_id=1)
+        Attendance.objects.create(student_id=self.students[0], attendance_date='2024-12-20', attendance_id=1)
+        Attendance.objects.create(student_id=self.students[1], attendance_date='2025-03-31', attendance_id=3)
+        incremental = monthly_counts()
+
+        # SQLで直接変更された場合を想定して集計を壊してから作り直す
+        AttendanceMonthly.objects.update(count=99)
+        out = io.StringIO()
+        call_command('rebuild_attendance_monthly', stdout=out)
+
+        self.assertEqual(monthly_counts(), incremental)
+        self.assertIn('月別集計: 2件', out.getvalue())
+        self.assertEqual(rebuild_monthly_attendance(), 2)
+
+    def test_report_reads_school_year_from_rollup(self):
+        first, second = self.students
+        Attendance.objects.create(student_id=first, attendance_date='2024-04-01', attendance_id=1)
+        Attendance.objects.create(student_id=first, attendance_date='2024-04-02', attendance_id=2)
+        Attendance.objects.create(student_id=second, attendance_date='2025-03-31', attendance_id=1)
+        # 年度外（翌年度の4月）は表示しない
+        Attendance.objects.create(student_id=second, attendance_date='2025-04-01', attendance_id=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('attendance:at_report'), {
+                'year': '2024', 'class': '101', 'school_year': '2024',
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('attendance_attendance"' in query['sql'] for query in queries))
+        students = response.context['students']
+        self.assertEqual(students[0].months[0], [('欠席', 1), ('遅刻', 1)])
+        self.assertEqual(students[1].months[11], [('欠席', 1)])
+        self.assertEqual(sum(len(cell) for cell in students[1].months), 1)
+        self.assertEqual(response.context['month_totals'][0], [('欠席', 1), ('遅刻', 1)])
+
+    def test_report_rejects_bad_school_year(self):
+        response = self.client.get(reverse('attendance:at_report'), {
+            'year': '2024', 'class': '101', 'school_year': '2024年',
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class RecomputeAbsencesTests(TestCase):
+    """欠席累計の再計算コマンドのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        cls.absent, cls.late, cls.none = Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+            for i in (1, 2, 3)
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(student_id=cls.absent, attendance_date='2024-12-05', attendance_id=1),
+            Attendance(student_id=cls.absent, attendance_date='2024-12-06', attendance_id=4),
+            Attendance(student_id=cls.late, attendance_date='2024-12-05', attendance_id=2),
+            Attendance(student_id=cls.late, attendance_date='2024-12-05', attendance_id=3),
+        ])
+        Student.objects.filter(pk=cls.absent.pk).update(absence_day=Decimal('1.0'))
+        # ずれている学生（遅刻・早退の学生は加算漏れ、出欠席のない学生は過剰）
+        Student.objects.filter(pk=cls.none.pk).update(absence_day=Decimal('2.5'))
+
+    def recompute(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('recompute_absences', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def absence_days(self):
+        return list(Student.objects.order_by('student_id').values_list('absence_day', flat=True))
+
+    def test_reports_and_fixes_drift(self):
+        out, err = self.recompute()
+
+        self.assertIn('修正: 2件', out)
+        self.assertEqual(err.splitlines(), ['0000000002: 0.0 -> 1.0', '0000000003: 2.5 -> 0.0'])
+        self.assertEqual(self.absence_days(), [Decimal('1.0'), Decimal('1.0'), Decimal('0.0')])
+        self.assertIn('修正: 0件', self.recompute()[0])
+
+    def test_dry_run_does_not_update(self):
+        out, err = self.recompute('--dry-run')
+
+        self.assertIn('ずれ: 2件', out)
+        self.assertEqual(self.absence_days(), [Decimal('1.0'), Decimal('0.0'), Decimal('2.5')])
+
+
+class AbsenceDayConcurrencyTests(TransactionTestCase):
+    """同時に出欠席を登録した場合の欠席累計のテスト"""
+
+    def setUp(self):
+        self.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        self.students = Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+            for i in range(1, 21)
+        ])
+
+    def test_counter_is_exact_under_concurrent_submissions(self):
+        """別々の日の登録と同じ日の二重送信を同時に行っても、欠席累計が出欠席データと一致すること"""
+        days = [f'2024-12-{day:02d}' for day in range(1, 9)]
+        # 各日を2つのスレッドから送信する（片方は二重送信）
+        submissions = days * 2
+        errors = []
+        barrier = threading.Barrier(len(submissions))
+
+        def submit(day):
+            try:
+                client = Client()
+                client.force_login(self.teacher)
+                data = {'select_day': day}
+                data.update({
+                    f'at_id_{student.student_id}': '1' if i % 2 else '2'
+                    for i, student in enumerate(self.students)
+                })
+                barrier.wait()
+                response = client.post(reverse('attendance:at_insert'), data)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit, args=(day,)) for day in submissions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Attendance.objects.count(), len(days) * len(self.students))
+        absence_days = dict(Student.objects.values_list('student_id', 'absence_day'))
+        for i, student in enumerate(self.students):
+            expected = Decimal('1.0') * len(days) if i % 2 else Decimal('0.5') * len(days)
+            self.assertEqual(absence_days[student.student_id], expected)
+        self.assertIn('修正: 0件', self.recompute())
+
+    def recompute(self):
+        out = io.StringIO()
+        call_command('recompute_absences', stdout=out, stderr=io.StringIO())
+        return out.getvalue()
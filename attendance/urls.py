@@ -6,5 +6,7 @@ app_name = 'attendance'
 urlpatterns = [
     path('at_search/', views.AttendanceSearchView, name='at_search'),
     path('at_insert/', views.AttendanceInsertView, name='at_insert'),
+    path('at_export/', views.AttendanceExportView, name='at_export'),
+    path('at_report/', views.AttendanceReportView, name='at_report'),
     
 ]
\ No newline at end of file
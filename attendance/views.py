@@ -1,9 +1,13 @@
 from django.shortcuts import render, redirect
-from students.models import Student, Course
-from .models import Attendance
+from students.models import Student
+from students.reference import ent_year_choices, get_courses, invalidate
+from .models import ATTENDANCE_CATEGORIES, Attendance, AttendanceMonthly, add_absence_days, add_monthly_attendance
+from students.exports import EXPORT_CHUNK_SIZE, csv_streaming_response
+from students.params import BadParameter, date_param, int_param
 import datetime
-from django.shortcuts import get_object_or_404
-from decimal import Decimal
+from django.http import Http404
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.contrib.auth.decorators import login_required
 
 # Create your views here.
@@ -57,23 +61,13 @@ def AttendanceSearchView(request):
         select_class = request.POST.get('class')
         select_day = request.POST.get('day')
 
-        student_list = Student.objects.filter(ent_year=select_year, class_id=select_class).order_by('student_id')
-
-    course_all = Course.objects.all().order_by('class_id')
-    dt = datetime.datetime.today()  # ローカルな現在の日付と時刻を取得
-    today_year = dt.year
-    ent_year = []
-    month = []
-    for i in range(today_year-10, today_year+11):
-        ent_year.append(i)
-
-    for i in range(1, 13):
-        month.append(i)
+        student_list = Student.objects.filter(ent_year=select_year, class_id=select_class).select_related('class_id').order_by('student_id')
 
+    # 選択肢はテンプレートの断片キャッシュがない場合だけ取得するよう、関数のまま渡す
     context = {
-        'course_all' : course_all,
-        'ent_year' : ent_year,
-        'monthes' : month,
+        'course_all' : get_courses,
+        'ent_year' : ent_year_choices(),
+        'monthes' : list(range(1, 13)),
         'select_year' : select_year,
         'select_day' : select_day,
         'select_class' : select_class,
@@ -81,6 +75,137 @@ def AttendanceSearchView(request):
     }
     return render(request, 'attendance/attendance_list.html', context)
 
+@login_required
+def AttendanceExportView(request):
+    """
+    出欠席データをCSVで出力するビュー。
+
+    入学年度・クラス・期間で絞り込んだ出欠席データを、
+    `values_list(...).iterator()` で少しずつ取得しながらストリーミングで出力します。
+    1年分の出欠席データでも、ファイル全体をメモリ上に作ることはありません。
+
+    Args:
+        request: HTTPリクエストオブジェクト
+            GETパラメータ:
+                - year: 入学年度（任意）
+                - class: クラス番号（任意）
+                - from: 期間の開始日 YYYY-MM-DD（任意）
+                - to: 期間の終了日 YYYY-MM-DD（任意）
+                - encoding: 'utf-8'（BOM付き、既定）または 'cp932'
+
+    Returns:
+        StreamingHttpResponse: 出欠席データのCSV
+    """
+    try:
+        select_year = int_param(request.GET, 'year')
+        date_from = date_param(request.GET, 'from')
+        date_to = date_param(request.GET, 'to')
+    except BadParameter as e:
+        return e.response()
+
+    attendances = Attendance.objects.all()
+    if select_year:
+        attendances = attendances.filter(student_id__ent_year=select_year)
+    if request.GET.get('class'):
+        attendances = attendances.filter(student_id__class_id=request.GET.get('class'))
+    if date_from:
+        attendances = attendances.filter(attendance_date__gte=date_from)
+    if date_to:
+        attendances = attendances.filter(attendance_date__lte=date_to)
+
+    rows = (
+        (student_id, last_name, first_name, class_id, attendance_date, ATTENDANCE_CATEGORIES.get(attendance_id, ''))
+        for student_id, last_name, first_name, class_id, attendance_date, attendance_id in attendances.order_by(
+            'student_id', 'attendance_date'
+        ).values_list(
+            'student_id', 'student_id__last_name', 'student_id__first_name', 'student_id__class_id',
+            'attendance_date', 'attendance_id',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    header = ['学生番号', '氏名', '名前', 'クラス番号', '日付', '分類']
+    return csv_streaming_response('attendance.csv', header, rows, request.GET.get('encoding', 'utf-8'))
+
+@login_required
+def AttendanceReportView(request):
+    """
+    クラス別・月別の出欠席レポートビュー。
+
+    入学年度・クラスで絞り込んだ学生ごとに、指定した年度（4月～翌年3月）の月別の出欠席件数を表示します。
+    件数は月別集計（`AttendanceMonthly`）だけを1回のクエリで取得するため、
+    出欠席データを何年分保存していても、表示にかかる時間は変わりません。
+
+    Args:
+        request: HTTPリクエストオブジェクト
+            GETパラメータ:
+                - year: 入学年度
+                - class: クラス番号
+                - school_year: 年度（省略時は今日の属する年度）
+
+    Returns:
+        HttpResponse: attendance_report.html テンプレートをレンダリングしたレスポンスを返します。
+
+    コンテキスト:
+        - course_all: 全てのクラスデータ（`Course` モデル）
+        - ent_year: 選択可能な入学年度（現在の年を基準に過去10年から未来10年まで）
+        - months: 表示する (年, 月) のリスト（4月～翌年3月）
+        - students: 学生のリスト。各学生の `months` に月ごとの (分類名, 件数) のリストを持つ
+        - month_totals: クラス全体の月ごとの (分類名, 件数) のリスト
+    """
+    today = datetime.date.today()
+    try:
+        select_year = int_param(request.GET, 'year')
+        school_year = int_param(request.GET, 'school_year') or (today.year if today.month >= 4 else today.year - 1)
+    except BadParameter as e:
+        return e.response()
+    select_class = request.GET.get('class', '')
+    months = [(school_year, month) for month in range(4, 13)] + [(school_year + 1, month) for month in range(1, 4)]
+
+    students = []
+    month_totals = []
+    if select_year and select_class:
+        students = list(
+            Student.objects.filter(ent_year=select_year, class_id=select_class)
+            .only('student_id', 'last_name', 'first_name').order_by('student_id')
+        )
+        counts = {}
+        totals = {}
+        monthly = AttendanceMonthly.objects.filter(
+            # year__in はインデックスの検索条件に年を含めるため（月の条件は下のQで絞り込む）
+            student_id__ent_year=select_year, student_id__class_id=select_class, count__gt=0,
+            year__in=[school_year, school_year + 1],
+        ).filter(
+            Q(year=school_year, month__gte=4) | Q(year=school_year + 1, month__lte=3)
+        ).values_list('student_id', 'year', 'month', 'attendance_id', 'count')
+        for student_id, year, month, category, count in monthly:
+            counts[(student_id, year, month, category)] = count
+            totals[(year, month, category)] = totals.get((year, month, category), 0) + count
+
+        for student in students:
+            student.months = [
+                [(name, counts[(student.student_id, year, month, category)])
+                 for category, name in ATTENDANCE_CATEGORIES.items()
+                 if (student.student_id, year, month, category) in counts]
+                for year, month in months
+            ]
+        month_totals = [
+            [(name, totals[(year, month, category)])
+             for category, name in ATTENDANCE_CATEGORIES.items()
+             if (year, month, category) in totals]
+            for year, month in months
+        ]
+
+    context = {
+        'course_all': get_courses,
+        'ent_year': ent_year_choices(),
+        'select_year': select_year,
+        'select_class': select_class,
+        'school_year': school_year,
+        'months': months,
+        'students': students,
+        'month_totals': month_totals,
+    }
+    return render(request, 'attendance/attendance_report.html', context)
+
 @login_required
 def AttendanceInsertView(request):
     """
@@ -104,13 +229,18 @@ def AttendanceInsertView(request):
 
     処理の流れ:
         1. POSTデータからキーと値を抽出し、学生IDと出欠席分類を取得します。
-        2. `Attendance` モデルに新しい出欠データを登録します。
-        3. 学生データ（`Student` モデル）の欠席累計（`absence_day`）を計算し、更新します。
-        4. 更新後の学生データをテンプレートに渡して表示します。
+        2. 送信された学生を1クエリでまとめて取得（行ロック）し、存在チェックを行います。
+        3. `Attendance` モデルに新しい出欠データを `bulk_create` で一括登録します。
+           同じ日・同じ分類で登録済みの学生はスキップします。
+        4. 月別集計（`AttendanceMonthly`）に、学生・月・分類ごとの件数を一括で加算します。
+        5. 学生データ（`Student` モデル）の欠席累計（`absence_day`）をF()式で一括更新します。
+        6. 更新後の学生データをテンプレートに渡して表示します。
 
     Notes:
-        - 学生IDが無効な場合、`get_object_or_404` によって404エラーを返します。
+        - 2～5は1つのトランザクション内で実行され、クエリ数は学生数に依存しません。
+        - 学生IDが無効な場合、404エラーを返します。
         - `category = 0` の場合、出欠席データは登録されません。
+        - 同じ内容を再送信（二重送信）しても、出欠席データと欠席累計は重複して加算されません。
         - 欠席累計は以下のルールで加算されます:
             - `1`: 欠席 -> `+1.0`
             - `2, 3`: 遅刻または早退 -> `+0.5`
@@ -130,50 +260,66 @@ def AttendanceInsertView(request):
     """
     if request.POST:
         attendance_data = {}
-        attendance_student = []
         select_day = request.POST.get('select_day')
 
-        attendance_categories = {
-        1: "欠席",
-        2: "遅刻",
-        3: "早退",
-        4: "その他"
-        }
-        
         # POSTデータからキーを探索して収集
         for key, value in request.POST.items():
             if key.startswith("at_id_"):  # "at_id_" で始まる名前を探す
                 student_id = key.split("_")[2]  # 学生IDを抽出
                 attendance_data[student_id] = value
 
-        for student_id, category in attendance_data.items():
-            # 存在チェックと取得
-            student = get_object_or_404(Student, student_id=student_id)
-            if category != '0':
-                Attendance.objects.create(
-                    student_id=student,
+        with transaction.atomic():
+            # 存在チェックと取得（送信された学生を1クエリでまとめて取得）
+            # 同じ学生への同時登録を順番に処理するため、学生番号順に行ロックを取る
+            students = {
+                student.student_id: student
+                for student in Student.objects.select_for_update().filter(
+                    student_id__in=list(attendance_data)
+                ).order_by('student_id')
+            }
+            if len(students) != len(attendance_data):
+                raise Http404('学生情報が見つかりません。')
+
+            # 同じ日・同じ分類で登録済みの出欠席は、二重送信とみなして登録・加算しない
+            registered = set(
+                Attendance.objects.filter(attendance_date=select_day, student_id__in=list(students))
+                .values_list('student_id', 'attendance_id')
+            )
+            new_data = [
+                (student_id, category)
+                for student_id, category in attendance_data.items()
+                if category != '0' and (student_id, int(category)) not in registered
+            ]
+
+            attendances = Attendance.objects.bulk_create([
+                Attendance(
+                    student_id=students[student_id],
                     attendance_id=category,
                     attendance_date=select_day
                 )
-            day = 0.0
-            if category == '1':
-                day += 1.0
-            elif category in ['2', '3']:
-                day += 0.5
-            else:
-                day += 0.0
-            select_student = Student.objects.get(student_id=student_id)
-            select_student.absence_day += Decimal(day)
-            select_student.save()
-            select_student = Student.objects.prefetch_related('attendance_set').get(student_id=student_id)
-            attendance_student.append(select_student)
-
-            # select_day = datetime.datetime.strptime(select_day, "%Y年%m月%d日").strftime("%Y-%m-%d")
+                for student_id, category in new_data
+            ])
+            # bulk_create ではシグナルが送られないため、月別集計への加算とキャッシュの無効化は明示的に行う
+            add_monthly_attendance(attendances)
+            if attendances:
+                invalidate(Attendance)
+
+            # 欠席累計はF()式を使い、1回のUPDATEでまとめて加算する
+            add_absence_days(new_data)
+
+        attendance_student = Student.objects.filter(
+            student_id__in=list(attendance_data)
+        ).select_related('class_id').prefetch_related(
+            Prefetch(
+                'attendance_set',
+                queryset=Attendance.objects.filter(attendance_date=select_day) if select_day else Attendance.objects.none()
+            )
+        ).order_by('student_id')
 
         context = {
                 'students' : attendance_student,
-                'attendance_categories': attendance_categories,
+                'attendance_categories': ATTENDANCE_CATEGORIES,
                 'select_day' : select_day,
             }
         return render(request, 'attendance/attendance_insert_execute.html', context)
-    return redirect('attendance:at_search')
\ No newline at end of file
+    return redirect('attendance:at_search')
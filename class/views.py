@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect
 from django.views import generic
-from students.models import Course
 from accounts.models import Teacher
+from students.conditional import conditional_page
+from students.models import Course
+from students.reference import get_courses, get_teacher_names
 from .forms import ClassCreateForm
 from django.contrib import messages
 from django.urls import reverse_lazy
@@ -10,6 +12,7 @@ from django.contrib.auth.decorators import login_required
 
 # Create your views here.
 @login_required
+@conditional_page(Course, Teacher)
 def ClassListView(request):
     """
     クラスの一覧を表示するビュー関数。
@@ -22,6 +25,10 @@ def ClassListView(request):
     2. 全ての `Teacher` インスタンスから、教師IDと教師名のペアを辞書にして取得する。
     3. `classes`（クラス情報）と `teacher`（教師情報）をコンテキストとして `class_list.html` テンプレートに渡す。
 
+    クラス・教師の情報は `students.reference` のキャッシュから取得するため、
+    クラス・教師が更新されるまではデータベースに問い合わせません。
+    また、`conditional_page` により、クラス・教師が更新されるまではブラウザの再検証に 304 を返します。
+
     引数:
     - request (HttpRequest): HTTPリクエストオブジェクト。
 
@@ -29,9 +36,9 @@ def ClassListView(request):
     - HttpResponse: `class_list.html` テンプレートがレンダリングされ、`classes` と `teacher` を含んだコンテキストが返されます。
     """
     # クラス情報を class_id の順で取得
-    classes = Course.objects.all().order_by('class_id')
+    classes = get_courses()
     # 教師IDと教師名を辞書形式で取得
-    teacher = {teacher.teacher_id: teacher.teacher_name for teacher in Teacher.objects.all()}
+    teacher = get_teacher_names()
     
     # テンプレートに渡すコンテキスト
     context = {
@@ -0,0 +1,9 @@
+#!/bin/sh
+# App Engine へのデプロイ。
+# App Engine はデプロイ時に collectstatic を実行しないため、ハッシュ付き・圧縮済みの静的ファイルとマニフェストを
+# staticfiles/ に集めてからアップロードする（マニフェストがないと gunicorn は起動しない）。
+# 使用例: ./deploy.sh --project studentsystem-446904
+set -e
+cd "$(dirname "$0")"
+DJANGO_STATIC_ROOT=staticfiles python manage.py collectstatic --noinput --clear
+gcloud app deploy app.yaml "$@"
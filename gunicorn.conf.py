@@ -0,0 +1,78 @@
+# gunicorn の設定（gunicorn は起動したディレクトリの gunicorn.conf.py を読み込む）
+# 使用例: gunicorn -b :8080 -w 4 studentapp.wsgi:application
+import os
+import shutil
+import tempfile
+
+# ワーカーごとのスレッド数。スレッドごとにデータベースへの接続を1本持ち、リクエストをまたいで使い回すため、
+# ワーカーあたりの接続プールの大きさになる（接続の総数 = ワーカー数 × スレッド数）。
+# ワーカー数は環境変数 WEB_CONCURRENCY で指定する。
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+# メモリーの増加や接続の不具合が続かないよう、一定数のリクエストを処理したワーカーは入れ替える
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+# メトリクス（/metrics）をワーカープロセス間で合計するため、各プロセスの値をファイルに書き出す。
+# ワーカーがアプリケーションを読み込む前に設定する必要がある。
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'studentapp_metrics'))
+
+
+def check_shared_cache(server):
+    """
+    キャッシュの設定が、ワーカー・サーバーの間で共有されるものか確認し、そうでなければ起動を拒否する。
+
+    - 複数のワーカーで LocMemCache（プロセスごと）を使うと、参照データのバージョンや画面のキャッシュが
+      ワーカーごとに別になり、他のワーカーが古いデータや 304 を返し続ける。
+    - セッションをキャッシュに保存する場合、サーバーごとのキャッシュでは、ログアウトしたセッションが
+      他のサーバーのキャッシュに残る。
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'studentapp.settings')
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if server.cfg.workers > 1 and backend == 'django.core.cache.backends.locmem.LocMemCache':
+        raise RuntimeError(
+            f'ワーカー数が {server.cfg.workers} ですが、キャッシュが LocMemCache（プロセスごと）です。'
+            'DJANGO_CACHE_BACKEND・DJANGO_CACHE_LOCATION で Redis などの共有キャッシュを指定してください。'
+        )
+    cached_sessions = settings.SESSION_ENGINE in (
+        'django.contrib.sessions.backends.cache', 'django.contrib.sessions.backends.cached_db',
+    )
+    if cached_sessions and backend not in settings.SHARED_CACHE_BACKENDS:
+        raise RuntimeError(
+            f'セッション（{settings.SESSION_ENGINE}）には全てのサーバーで共有するキャッシュが必要ですが、'
+            f'キャッシュが {backend} です。DJANGO_CACHE_BACKEND で Redis などを指定するか、'
+            'DJANGO_SESSION_ENGINE=django.contrib.sessions.backends.db を指定してください。'
+        )
+
+
+def check_static_manifest(server):
+    """
+    collectstatic の結果（マニフェスト）があるか確認し、なければ起動を拒否する。
+
+    マニフェストがないと、静的ファイルを参照する全ての画面が 500 になるため。
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'studentapp.settings')
+    from django.conf import settings
+
+    manifest = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+    if not settings.DEBUG and not os.path.exists(manifest):
+        raise RuntimeError(
+            f'{manifest} がありません。デプロイ前に python manage.py collectstatic --noinput を実行してください。'
+        )
+
+
+def on_starting(server):
+    """起動時に、キャッシュ・静的ファイルを確認し、前回の起動で書き出されたメトリクスのファイルを削除する"""
+    check_shared_cache(server)
+    check_static_manifest(server)
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """終了したワーカーのメトリクスのファイルを、集計の対象から外す"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
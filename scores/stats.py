@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Max, Min, Q, StdDev, Window
+from django.db.models.functions import PercentRank, Rank
+
+from studentapp.metrics import record_cache
+from students.models import Score
+from students.reference import get_version, invalidate
+
+# 成績統計のキャッシュ有効期間（秒）
+# 点数の登録画面では該当する統計を、学生・点数の1件ずつの変更（管理画面など）では全ての統計を無効にする
+SCORE_STATS_CACHE_TIMEOUT = 60 * 60
+
+# ヒストグラムの階級（0～9点, 10～19点, ..., 90～100点）
+HISTOGRAM_BUCKETS = [(low, low + 9 if low < 90 else 100) for low in range(0, 100, 10)]
+
+
+class Median(Aggregate):
+    """中央値（PostgreSQLの percentile_cont）"""
+    function = 'PERCENTILE_CONT'
+    name = 'Median'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+# 全ての成績統計をまとめて無効にするためのバージョン名（点数のCSV取込など）
+SCORE_STATS_VERSION = 'score_stats'
+
+
+def stats_cache_key(ent_year, class_id, subject_id):
+    return f'score_stats:{get_version(SCORE_STATS_VERSION)}:{ent_year}:{class_id}:{subject_id}'
+
+
+def invalidate_score_statistics(ent_year, class_id, subject_id):
+    """入学年度・クラス・科目の成績統計のキャッシュを削除する"""
+    cache.delete(stats_cache_key(ent_year, class_id, subject_id))
+
+
+def invalidate_all_score_statistics():
+    """全ての成績統計のキャッシュを無効にする"""
+    invalidate(SCORE_STATS_VERSION)
+
+
+def compute_score_statistics(ent_year, class_id, subject_id):
+    """
+    入学年度・クラス・科目ごとの成績統計をデータベースで計算する。
+
+    平均・中央値・標準偏差・最小・最大とヒストグラムは1回の集計クエリで、
+    学生ごとの順位・パーセンタイルはウィンドウ関数を使った1回のクエリで計算します。
+
+    戻り値:
+        dict: summary（集計値）, histogram（(下限, 上限, 人数) のリスト）,
+              ranking（学生ごとの点数・順位・パーセンタイルのリスト、点数の高い順）
+    """
+    scores = Score.objects.filter(
+        student_id__ent_year=ent_year, student_id__class_id=class_id, subject_id=subject_id,
+    )
+    buckets = {
+        f'bucket_{low}': Count('id', filter=Q(score__gte=low, score__lte=high))
+        for low, high in HISTOGRAM_BUCKETS
+    }
+    summary = scores.aggregate(
+        count=Count('id'),
+        mean=Avg('score'),
+        median=Median('score'),
+        stddev=StdDev('score'),
+        min=Min('score'),
+        max=Max('score'),
+        **buckets,
+    )
+    histogram = [(low, high, summary.pop(f'bucket_{low}')) for low, high in HISTOGRAM_BUCKETS]
+
+    ranking = list(
+        scores.annotate(
+            rank=Window(Rank(), order_by=F('score').desc()),
+            # 自分より点数の低い学生の割合（%）
+            percentile=Window(PercentRank(), order_by=F('score').asc()) * 100,
+        ).order_by('-score', 'student_id').values(
+            'student_id', 'student_id__last_name', 'student_id__first_name', 'score', 'rank', 'percentile',
+        )
+    )
+    return {'summary': summary, 'histogram': histogram, 'ranking': ranking}
+
+
+def get_score_statistics(ent_year, class_id, subject_id):
+    """成績統計をキャッシュから取得する（キャッシュにない場合は計算してキャッシュする）"""
+    key = stats_cache_key(ent_year, class_id, subject_id)
+    stats = cache.get(key)
+    record_cache('score_stats', stats is not None)
+    if stats is None:
+        stats = compute_score_statistics(ent_year, class_id, subject_id)
+        cache.set(key, stats, timeout=SCORE_STATS_CACHE_TIMEOUT)
+    return stats
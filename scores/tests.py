@@ -1,3 +1,227 @@
+import time
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Teacher
+from students.models import Course, Score, Student, Subject
+from students.reference import get_subject_names
 
 # Create your tests here.
+class ScoreExecuteViewTests(TestCase):
+    """点数登録・更新ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        cls.course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        cls.subject = Subject.objects.create(subject_id='A01', subject_name='数学')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def create_students(self, count, start=1):
+        return Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024, class_id=self.course)
+            for i in range(start, start + count)
+        ])
+
+    def post_scores(self, scores):
+        data = {'select_class': '101', 'select_year': '2024', 'select_sub': 'A01'}
+        data.update({f'score_{student_id}': score for student_id, score in scores.items()})
+        return self.client.post(reverse('scores:score_execute'), data)
+
+    def test_scores_are_inserted_and_updated(self):
+        first, second, blank = self.create_students(3)
+        Score.objects.create(student_id=first, subject_id=self.subject, score=50)
+
+        response = self.post_scores({first.student_id: '80', second.student_id: '70', blank.student_id: ''})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(Score.objects.values_list('student_id', 'score')),
+            {first.student_id: 80, second.student_id: 70},
+        )
+        self.assertEqual(len(list(get_messages(response.wsgi_request))), 1)
+
+    def test_unchanged_scores_are_skipped(self):
+        student, = self.create_students(1)
+        Score.objects.create(student_id=student, subject_id=self.subject, score=90)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.post_scores({student.student_id: '90'})
+
+        self.assertFalse(any(query['sql'].startswith('INSERT') for query in queries))
+        self.assertEqual(Score.objects.get().score, 90)
+
+    def test_unknown_student_returns_404(self):
+        response = self.post_scores({'9999999999': '80'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Score.objects.exists())
+
+    def test_query_count_is_flat_as_grade_sheet_grows(self):
+        """10人でも500人でも点数登録のクエリ数が変わらないこと"""
+        query_counts = []
+        start = 1
+        get_subject_names()  # 参照データのキャッシュを温めておく
+        for size in (10, 500):
+            students = self.create_students(size, start=start)
+            start += size
+            with CaptureQueriesContext(connection) as queries:
+                self.post_scores({student.student_id: '60' for student in students})
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertEqual(Score.objects.count(), 510)
+
+
+class ScorelistViewTests(TestCase):
+    """成績一覧ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        cls.subject = Subject.objects.create(subject_id='A01', subject_name='数学')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def create_class(self, class_id, size, start=1):
+        course = Course.objects.create(class_id=class_id, course_name='システム開発コース')
+        students = Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+            for i in range(start, start + size)
+        ])
+        Score.objects.bulk_create([
+            Score(student_id=student, subject_id=self.subject, score=i % 101)
+            for i, student in enumerate(students)
+        ])
+        return students
+
+    def search(self, class_id):
+        return self.client.post(reverse('scores:score_list'), {'year': '2024', 'class': class_id, 'subject': 'A01'})
+
+    def test_each_student_gets_own_score(self):
+        first, second = self.create_class('101', 2)
+        Score.objects.filter(student_id=second).delete()
+
+        response = self.search('101')
+
+        scores = {student.student_id: student.subject_score for student in response.context['students']}
+        self.assertEqual(scores, {first.student_id: 0, second.student_id: None})
+
+    def test_render_is_linear_with_fixed_query_count(self):
+        """50人・500人・5000人のクラスで、クエリ数が一定で、1人あたりの描画時間が増えないこと"""
+        query_counts = []
+        timings = {}
+        # 参照データのキャッシュ・テンプレートの読み込みを済ませておく
+        self.search('000')
+        start = 1
+        for class_id, size in (('101', 50), ('102', 500), ('103', 5000)):
+            self.create_class(class_id, size, start=start)
+            start += size
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = self.search(class_id)
+                timings[size] = (time.perf_counter() - started) * 1000
+            self.assertEqual(len(response.context['students']), size)
+            query_counts.append(len(queries))
+
+        self.assertEqual(len(set(query_counts)), 1, query_counts)
+        # 生徒数×点数の二重ループなら、5000人の1人あたりの時間は500人の10倍になる
+        per_student = {size: ms / size for size, ms in timings.items()}
+        self.assertLess(per_student[5000], per_student[500] * 3, timings)
+
+
+class ScoreExportViewTests(TestCase):
+    """成績CSV出力ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        student = Student.objects.create(student_id='0000000001', last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+        math = Subject.objects.create(subject_id='A01', subject_name='数学')
+        english = Subject.objects.create(subject_id='A02', subject_name='英語')
+        Score.objects.create(student_id=student, subject_id=math, score=80)
+        Score.objects.create(student_id=student, subject_id=english, score=70)
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_streams_scores_for_subject(self):
+        response = self.client.get(reverse('scores:score_export'), {'year': '2024', 'class': '101', 'subject': 'A02'})
+
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[1:], ['0000000001,長野,太郎,2024,101,A02,英語,70'])
+
+
+class ScoreStatsViewTests(TestCase):
+    """成績統計ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        cls.subject = Subject.objects.create(subject_id='A01', subject_name='数学')
+        cls.students = Student.objects.bulk_create([
+            Student(student_id=str(i).zfill(10), last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+            for i in range(1, 6)
+        ])
+        Score.objects.bulk_create([
+            Score(student_id=student, subject_id=cls.subject, score=score)
+            for student, score in zip(cls.students, (40, 60, 60, 85, 100))
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+
+    def get_stats(self):
+        return self.client.get(reverse('scores:score_stats'), {'year': '2024', 'class': '101', 'subject': 'A01'})
+
+    def test_statistics_are_computed_in_database(self):
+        response = self.get_stats()
+        stats = response.context['stats']
+
+        self.assertEqual(stats['summary']['count'], 5)
+        self.assertAlmostEqual(stats['summary']['mean'], 69.0)
+        self.assertAlmostEqual(stats['summary']['median'], 60.0)
+        self.assertAlmostEqual(stats['summary']['stddev'], 21.0713075057, places=6)
+        self.assertEqual((stats['summary']['min'], stats['summary']['max']), (40, 100))
+        self.assertEqual([count for low, high, count in stats['histogram']], [0, 0, 0, 0, 1, 0, 2, 0, 1, 1])
+        self.assertEqual(
+            [(row['score'], row['rank'], row['percentile']) for row in stats['ranking']],
+            [(100, 1, 100.0), (85, 2, 75.0), (60, 3, 25.0), (60, 3, 25.0), (40, 5, 0.0)],
+        )
+
+    def test_refresh_is_cached_until_scores_change(self):
+        self.get_stats()
+        # 教師の取得以外はクエリを発行しない
+        with self.assertNumQueries(1):
+            self.get_stats()
+
+        self.client.post(reverse('scores:score_execute'), {
+            'select_class': '101', 'select_year': '2024', 'select_sub': 'A01',
+            f'score_{self.students[0].student_id}': '90',
+        })
+
+        self.assertEqual(self.get_stats().context['stats']['summary']['min'], 60)
+
+    def test_single_score_change_invalidates_statistics(self):
+        self.get_stats()
+        # 管理画面などでの1件ずつの変更（save）でも、統計を計算し直す
+        score = Score.objects.get(student_id=self.students[0])
+        score.score = 90
+        score.save()
+
+        self.assertEqual(self.get_stats().context['stats']['summary']['min'], 60)
+
+    def test_bad_year_is_rejected(self):
+        response = self.client.get(reverse('scores:score_stats'), {'year': 'abc', 'class': '101', 'subject': 'A01'})
+        self.assertEqual(response.status_code, 400)
@@ -5,6 +5,8 @@ app_name = 'scores'
 
 urlpatterns = [
     path('scorelist/', views.ScorelistView, name='score_list'),
+    path('scoreexport/', views.ScoreExportView, name='score_export'),
+    path('scorestats/', views.ScoreStatsView, name='score_stats'),
     path('scoreexecute/', views.ScoreExecuteView, name='score_execute'),
     path('sublist/', views.SubjectListView, name='sub_list'),
     path('subcreate/', views.SubjectCreateView.as_view(), name='sub_create'),
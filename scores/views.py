@@ -1,11 +1,18 @@
 from django.shortcuts import render, redirect
-import datetime
 from django.views import generic
-from students.models import Course, Student, Subject, Score
+from students.models import Student, Subject, Score
+from students.exports import EXPORT_CHUNK_SIZE, csv_streaming_response
+from students.params import BadParameter, int_param
+from students.conditional import conditional_page
+from students.reference import ent_year_choices, get_courses, get_subject_names, get_subjects, invalidate
+from .stats import get_score_statistics, invalidate_score_statistics
 from .forms import SubjectForm
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 
@@ -16,6 +23,7 @@ def ScorelistView(request):
     学生のスコアを表示およびフィルタリングするビュー関数。
 
     この関数は、選択された年度、クラス、科目に基づいて学生情報およびスコアをフィルタリングし、テンプレートにデータを渡します。
+    クラス・科目の一覧は `students.reference` のキャッシュから取得します。
 
     引数:
         request: HttpRequestオブジェクト。
@@ -31,44 +39,128 @@ def ScorelistView(request):
         - select_class: POSTリクエストで選択されたクラス (デフォルトは空)。
         - select_sub: POSTリクエストで選択された科目 (デフォルトは空)。
         - students: フィルタリングされた学生リスト (選択された年度とクラスに基づく)。
-        - stu_subject: フィルタリングされたスコアリスト (選択された科目と学生リストに基づく)。
+                    各学生には選択された科目の点数が `subject_score` として結合されています。
         - subject_dict: subject_idをキー、subject_nameを値とした辞書 (テンプレートでのクイックルックアップ用)。
     """
     select_year = ''
     select_class = '' 
     select_sub = ''
     student_list = ''
-    stu_subject = ''
-    subject_dict = {subject.subject_id: subject.subject_name for subject in Subject.objects.all()}
+    subject_dict = get_subject_names()
     if request.POST:
         select_year = int(request.POST.get('year'))
         select_class = request.POST.get('class')
         select_sub = request.POST.get('subject')
 
-        student_list = Student.objects.filter(ent_year=select_year, class_id=select_class).order_by('student_id')
-        stu_subject = Score.objects.filter(subject_id=select_sub, student_id__in=student_list)
-
-    course_all = Course.objects.all().order_by('class_id')
-    subject_all = Subject.objects.all().order_by('subject_id')
-    dt = datetime.datetime.today()  # ローカルな現在の日付と時刻を取得
-    today_year = dt.year
-    ent_year = []
-    for i in range(today_year-10, today_year+11):
-        ent_year.append(i)
+        # 学生ごとの点数をサブクエリで結合し、テンプレートでの全件走査をなくす
+        subject_score = Score.objects.filter(subject_id=select_sub, student_id=OuterRef('pk')).values('score')[:1]
+        student_list = Student.objects.filter(
+            ent_year=select_year, class_id=select_class
+        ).select_related('class_id').annotate(
+            subject_score=Subquery(subject_score)
+        ).order_by('student_id')
 
+    # 選択肢はテンプレートの断片キャッシュがない場合だけ取得するよう、関数のまま渡す
     context = {
-        'course_all' : course_all,
-        'ent_year' : ent_year,
-        'subject_all' : subject_all,
+        'course_all' : get_courses,
+        'ent_year' : ent_year_choices(),
+        'subject_all' : get_subjects,
         'select_year' : select_year,
         'select_sub' : select_sub,
         'select_class' : select_class,
         'students' : student_list,
-        'stu_subject' : stu_subject,
         'subject_dict' : subject_dict,
     }
     return render(request, 'scores/score_list.html', context)
 
+@login_required
+def ScoreExportView(request):
+    """
+    成績一覧をCSVで出力するビュー関数。
+
+    成績一覧画面と同じ条件（入学年度・クラス・科目）で絞り込んだ点数を、
+    `values_list(...).iterator()` で少しずつ取得しながらストリーミングで出力します。
+    科目を指定しない場合は、全科目の点数を出力します。
+
+    引数:
+        request: HttpRequestオブジェクト。
+            GETパラメータ:
+                - year: 入学年度（任意）
+                - class: クラス番号（任意）
+                - subject: 科目番号（任意）
+                - encoding: 'utf-8'（BOM付き、既定）または 'cp932'
+
+    戻り値:
+        StreamingHttpResponse: 点数のCSV。
+    """
+    try:
+        select_year = int_param(request.GET, 'year')
+    except BadParameter as e:
+        return e.response()
+
+    scores = Score.objects.all()
+    if select_year:
+        scores = scores.filter(student_id__ent_year=select_year)
+    if request.GET.get('class'):
+        scores = scores.filter(student_id__class_id=request.GET.get('class'))
+    if request.GET.get('subject'):
+        scores = scores.filter(subject_id=request.GET.get('subject'))
+
+    rows = scores.order_by('student_id', 'subject_id').values_list(
+        'student_id', 'student_id__last_name', 'student_id__first_name', 'student_id__ent_year',
+        'student_id__class_id', 'subject_id', 'subject_id__subject_name', 'score',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    header = ['学生番号', '氏名', '名前', '入学年度', 'クラス番号', '科目番号', '科目名', '点数']
+    return csv_streaming_response('scores.csv', header, rows, request.GET.get('encoding', 'utf-8'))
+
+@login_required
+def ScoreStatsView(request):
+    """
+    入学年度・クラス・科目ごとの成績統計を表示するビュー関数。
+
+    平均・中央値・標準偏差・最小・最大、10点ごとのヒストグラム、学生ごとの順位とパーセンタイルを表示します。
+    統計はPostgreSQLの集計関数・ウィンドウ関数で計算し（`scores.stats`）、結果はキャッシュします。
+    点数登録（`ScoreExecuteView`）で該当する点数が変更されるまでは、データベースに問い合わせません。
+
+    引数:
+        request: HttpRequestオブジェクト。
+            GETパラメータ:
+                - year: 入学年度
+                - class: クラス番号
+                - subject: 科目番号
+
+    戻り値:
+        HttpResponse: `score_stats.html` テンプレートをレンダリングしたレスポンス。
+
+    コンテキストデータ:
+        - course_all, subject_all, ent_year: 検索フォームの選択肢。
+        - select_year, select_class, select_sub: 選択された条件。
+        - stats: 成績統計（summary, histogram, ranking）。条件が揃っていない場合は None。
+    """
+    try:
+        select_year = int_param(request.GET, 'year')
+    except BadParameter as e:
+        return e.response()
+    select_class = request.GET.get('class', '')
+    select_sub = request.GET.get('subject', '')
+
+    stats = None
+    if select_year and select_class and select_sub:
+        stats = get_score_statistics(select_year, select_class, select_sub)
+
+    # 選択肢はテンプレートの断片キャッシュがない場合だけ取得するよう、関数のまま渡す
+    context = {
+        'course_all': get_courses,
+        'subject_all': get_subjects,
+        'ent_year': ent_year_choices(),
+        'select_year': select_year,
+        'select_class': select_class,
+        'select_sub': select_sub,
+        'subject_dict': get_subject_names(),
+        'stats': stats,
+    }
+    return render(request, 'scores/score_stats.html', context)
+
 @login_required
 def ScoreExecuteView(request):
     """
@@ -80,8 +172,10 @@ def ScoreExecuteView(request):
 
     フォームで送られた学生IDごとのスコアデータ（「score_学生ID」）を利用し、既存の生徒に関連するスコアを更新し、
     必要があれば新たにスコアを登録します。
+    点数は1つのトランザクション内で `bulk_create(update_conflicts=True)` によって一括で登録・更新され、
+    既存の点数から変更のない学生はスキップされます。
 
-    成功した場合、メッセージを表示し、フォームを再描画します。
+    成功した場合、登録・更新件数をまとめたメッセージを1件表示し、フォームを再描画します。
 
     Returns:
         render: 点数登録/更新画面を表示するテンプレートとコンテキストを返す。
@@ -95,7 +189,7 @@ def ScoreExecuteView(request):
     select_class = ''
     select_year = ''
     if request.POST:
-        subject_dict = {subject.subject_id: subject.subject_name for subject in Subject.objects.all()}
+        subject_dict = get_subject_names()
 
         select_class = request.POST.get('select_class')
         select_year = request.POST.get('select_year')
@@ -107,18 +201,41 @@ def ScoreExecuteView(request):
                 scores_data[student_id] = value
 
         subject = get_object_or_404(Subject, subject_id=select_sub)
-        for student_id, category in scores_data.items():
-            # 存在チェックと取得
-            student = get_object_or_404(Student, student_id=student_id)
-            if category != '':
-                Score.objects.update_or_create(
-                student_id=student,
-                subject_id=subject,
-                defaults={'score': category}
-                )
-                messages.success(request, "点数を登録・更新しました。")
-
-        students = Student.objects.filter(ent_year=select_year, class_id=select_class).order_by('student_id')
+        with transaction.atomic():
+            # 存在チェックと取得（送信された学生を1クエリでまとめて取得）
+            students = Student.objects.in_bulk(list(scores_data), field_name='student_id')
+            if len(students) != len(scores_data):
+                raise Http404('学生情報が見つかりません。')
+
+            # 既存の点数と比較し、変更のあった点数だけを登録・更新する
+            current_scores = dict(
+                Score.objects.filter(subject_id=subject, student_id__in=list(scores_data))
+                .values_list('student_id', 'score')
+            )
+            changed_scores = [
+                Score(student_id=students[student_id], subject_id=subject, score=int(score))
+                for student_id, score in scores_data.items()
+                if score != '' and current_scores.get(student_id) != int(score)
+            ]
+            Score.objects.bulk_create(
+                changed_scores,
+                update_conflicts=True,
+                unique_fields=['student_id', 'subject_id'],
+                update_fields=['score'],
+            )
+        if changed_scores:
+            invalidate(Score)
+            # この入学年度・クラス・科目の成績統計を計算し直すため、キャッシュを削除する
+            invalidate_score_statistics(select_year, select_class, select_sub)
+            messages.success(request, f"点数を登録・更新しました。（{len(changed_scores)}件）")
+        else:
+            messages.info(request, "変更された点数はありません。")
+
+        students = Student.objects.filter(
+            ent_year=select_year, class_id=select_class
+        ).select_related('class_id').prefetch_related(
+            Prefetch('score_set', queryset=Score.objects.filter(subject_id=subject))
+        ).order_by('student_id')
         context = {
              'students' : students,
              'select_sub' : select_sub,
@@ -129,12 +246,14 @@ def ScoreExecuteView(request):
     return redirect('scores:score_list')
 
 @login_required
+@conditional_page(Subject)
 def SubjectListView(request):
     """
     科目一覧を表示するビュー
 
     このビューでは、データベースから全ての科目を取得し、それを科目ID順に並べ替えて一覧として表示します。
     科目一覧はテンプレートである「subject_list.html」に渡され、ユーザーに表示されます。
+    科目が更新されるまでは、ブラウザの再検証（If-None-Match）に 304 を返します。
 
     Returns:
         render: 科目一覧画面を表示するテンプレートとコンテキストを返す。
@@ -143,7 +262,7 @@ def SubjectListView(request):
         request: HTTPリクエストオブジェクト。このリクエストには特にデータは含まれていませんが、
                  ビューのレスポンスとして科目一覧を返すために使用されます。
     """
-    sub_list = Subject.objects.all().order_by('subject_id')
+    sub_list = get_subjects()
     context = {
         'sub_list' : sub_list,
     }
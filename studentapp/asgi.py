@@ -5,6 +5,23 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+本番環境は WSGI（gunicorn studentapp.wsgi:application）で起動し、ビューを非同期にする・ASGI で起動することはしない。
+
+- psycopg2 は非同期に対応していないため、非同期ビューの ORM も sync_to_async で1件ずつ実行され、
+  クエリは並行にならない。ビュー・ミドルウェアも同期のため、ASGI ではスレッドとの切り替えが増えるだけになる。
+- Django 4.2 の ASGI は、同期のイテレーターの StreamingHttpResponse（CSV 出力）を
+  全てメモリに読み込んでから送信するため、出力の件数に比例してメモリを使う。
+
+計測（bench データベース、ワーカー4、2000リクエスト・同時64、CPU 1）:
+
+    WSGI  CONN_MAX_AGE=60          /scores/scorelist/   97.7 req/s  p50  649ms  p99  793ms
+    WSGI  CONN_MAX_AGE=0           /scores/scorelist/   64.6 req/s  p50  991ms  p99 1121ms
+    ASGI（uvicorn）CONN_MAX_AGE=0  /scores/scorelist/   47.0 req/s  p50 1309ms  p99 2689ms
+    WSGI  CONN_MAX_AGE=60          /student_list/       28.7 req/s  p50 2149ms  p99 3020ms
+    ASGI（uvicorn）CONN_MAX_AGE=0  /student_list/       18.7 req/s  p50 3082ms  p99 8325ms
+
+非同期に対応したデータベースドライバー（psycopg 3）に移行するまでは、WSGI と持続的な接続を使う。
 """
 
 import os
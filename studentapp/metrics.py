@@ -0,0 +1,83 @@
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+# gunicorn など複数プロセスで動かす場合は、環境変数 PROMETHEUS_MULTIPROC_DIR のディレクトリに
+# 各プロセスの値を書き出し、/metrics で合計する（gunicorn.conf.py で設定する）。
+
+REQUEST_DURATION = Histogram(
+    'studentapp_request_duration_seconds', 'リクエストの処理時間（秒）', ['view', 'method'],
+)
+REQUESTS = Counter(
+    'studentapp_requests', 'リクエスト数', ['view', 'method', 'status'],
+)
+REQUEST_ERRORS = Counter(
+    'studentapp_request_errors', 'サーバーエラー（5xx）になったリクエスト数', ['view', 'status'],
+)
+DB_QUERIES = Counter(
+    'studentapp_db_queries', '実行したSQLの件数', ['view'],
+)
+DB_QUERY_SECONDS = Counter(
+    'studentapp_db_query_seconds', 'SQLの実行時間の合計（秒）', ['view'],
+)
+TEMPLATE_SECONDS = Counter(
+    'studentapp_template_render_seconds', 'テンプレートの描画時間の合計（秒）', ['view'],
+)
+CACHE_REQUESTS = Counter(
+    'studentapp_cache_requests', 'キャッシュの参照回数（ヒット率は hit / (hit + miss)）', ['cache', 'result'],
+)
+
+
+def record_cache(name, hit):
+    """キャッシュの参照結果を記録する（`name` は参照データ・成績統計などの名前）"""
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def record_request(view, method, status, seconds, profile):
+    """
+    1リクエスト分のメトリクスを記録する。
+
+    引数:
+        view (str): URL名（'scores:score_list' など）
+        method (str): HTTPメソッド
+        status (int): ステータスコード
+        seconds (float): 処理時間（秒）
+        profile (RequestProfile): SQL・テンプレート描画の計測結果
+    """
+    REQUEST_DURATION.labels(view, method).observe(seconds)
+    REQUESTS.labels(view, method, str(status)).inc()
+    if status >= 500:
+        REQUEST_ERRORS.labels(view, str(status)).inc()
+    DB_QUERIES.labels(view).inc(len(profile.queries))
+    DB_QUERY_SECONDS.labels(view).inc(profile.sql_ms / 1000)
+    TEMPLATE_SECONDS.labels(view).inc(profile.template_ms / 1000)
+
+
+@require_GET
+def MetricsView(request):
+    """
+    メトリクスを Prometheus のテキスト形式で返すビュー。
+
+    設定 `METRICS_TOKEN`（環境変数 DJANGO_METRICS_TOKEN）を指定した場合は、
+    `Authorization: Bearer <トークン>` ヘッダーのあるリクエストだけに返します。
+    本番（DEBUG=False）でトークンを指定していない場合は、公開しないよう 404 を返します。
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=403)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
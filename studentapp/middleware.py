@@ -0,0 +1,116 @@
+import datetime
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from .metrics import record_request
+from .nplusone import N_PLUS_ONE_THRESHOLD, NPlusOneError, track_queries
+from .profiling import install_template_timer, profile_request
+
+logger = logging.getLogger('studentapp.nplusone')
+profile_logger = logging.getLogger('studentapp.sqlprofile')
+
+
+class NPlusOneMiddleware:
+    """
+    リクエストごとに実行されたSQLを形で数え、N+1 クエリを検出するミドルウェア。
+
+    同じ形のSELECT文がパラメーターを変えて `N_PLUS_ONE_THRESHOLD` 回以上実行されたら、
+    ビュー名・テンプレートの行・コードの位置とともに報告します。
+
+    - `N_PLUS_ONE_RAISE` が True（テスト実行時）: `NPlusOneError` を送出する
+    - それ以外: `N_PLUS_ONE_SAMPLE_RATE` の割合のリクエストだけを調べ、警告をログに出力する
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        raise_error = getattr(settings, 'N_PLUS_ONE_RAISE', False)
+        if not raise_error and random.random() >= getattr(settings, 'N_PLUS_ONE_SAMPLE_RATE', 0):
+            return self.get_response(request)
+
+        with track_queries(getattr(settings, 'N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)) as tracker:
+            response = self.get_response(request)
+        if tracker.problems:
+            match = request.resolver_match
+            label = f'{request.method} {request.path} ({match.view_name if match else "-"})'
+            if raise_error:
+                raise NPlusOneError(tracker.report(label))
+            logger.warning(tracker.report(label))
+        return response
+
+
+class SQLProfilingMiddleware:
+    """
+    リクエストごとのSQL・テンプレート描画の計測結果を、JSON形式で1行ずつログに出力するミドルウェア。
+
+    設定 `SQL_PROFILE_LOG`（環境変数 DJANGO_SQL_PROFILE_LOG）を指定した場合だけ有効になり、
+    `SQL_PROFILE_SAMPLE_RATE` の割合のリクエストを計測します。
+    出力したログは `python manage.py sql_profile_report` で集計できます。
+
+    出力例（1行）:
+        {"time": "...", "method": "GET", "path": "/scores/", "view": "scores:score_list", "status": 200,
+         "duration_ms": 12.3, "sql_count": 3, "sql_ms": 4.5, "template_ms": 6.1,
+         "slowest_queries": [{"sql": "SELECT ...", "ms": 2.1}], "duplicate_queries": []}
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        if random.random() >= getattr(settings, 'SQL_PROFILE_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with profile_request() as profile:
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        profile_logger.info(json.dumps(dict({
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else '',
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+        }, **profile.as_dict()), ensure_ascii=False))
+        return response
+
+
+class MetricsMiddleware:
+    """
+    リクエストごとの処理時間・SQL・テンプレート描画を計測するミドルウェア。
+
+    計測結果を Prometheus のメトリクス（`studentapp.metrics`、/metrics で公開）に記録し、
+    レスポンスに `Server-Timing` ヘッダーを付けます。ブラウザの開発者ツールで、
+    SQL（db）・テンプレート描画（tpl）・全体（total）の時間を確認できます。
+
+    ヘッダーの例:
+        Server-Timing: db;dur=4.52;desc="3 queries", tpl;dur=6.10, total;dur=12.31
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with profile_request() as profile:
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+
+        # URL名で集計する（存在しないURLはパスごとに分けない）
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        record_request(view, request.method, response.status_code, seconds, profile)
+        response['Server-Timing'] = (
+            f'db;dur={profile.sql_ms:.2f};desc="{len(profile.queries)} queries", '
+            f'tpl;dur={profile.template_ms:.2f}, total;dur={seconds * 1000:.2f}'
+        )
+        return response
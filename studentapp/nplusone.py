@@ -0,0 +1,121 @@
+import os
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+from . import profiling
+
+# 同じ形のクエリがこの回数（パラメーターが異なるもの）以上実行されたら N+1 とみなす
+N_PLUS_ONE_THRESHOLD = 5
+
+
+class NPlusOneError(AssertionError):
+    """N+1 クエリを検出した（テスト実行時）"""
+
+
+def fingerprint(sql):
+    """
+    SQLの形（パラメーターを除いた文）を返す。
+
+    `IN (%s, %s, ...)` のようにパラメーターの個数だけが違うクエリも、同じ形として扱う。
+    """
+    sql = re.sub(r'%s(?:\s*,\s*%s)+', '%s', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def is_project_code(filename):
+    """プロジェクトのコードか（インストールしたパッケージ・計測用のモジュールを除く）"""
+    return (
+        filename.startswith(str(settings.BASE_DIR)) and 'site-packages' not in filename
+        and filename not in (__file__, profiling.__file__)
+    )
+
+
+def find_trigger():
+    """
+    クエリを実行したテンプレートの行とプロジェクトのコードを探す。
+
+    戻り値:
+        tuple: (テンプレート名:行番号, ファイル名:行番号 関数名)。見つからない場合は ''
+    """
+    template = code = ''
+    frame = sys._getframe(1)
+    while frame is not None and not (template and code):
+        f_code = frame.f_code
+        if not template and f_code is Node.render_annotated.__code__:
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name or origin.name}:{token.lineno}'
+        elif not code and is_project_code(f_code.co_filename):
+            code = f'{os.path.relpath(f_code.co_filename, settings.BASE_DIR)}:{frame.f_lineno} {f_code.co_name}'
+        frame = frame.f_back
+    return template, code
+
+
+class QueryShapeTracker:
+    """
+    実行されたSELECT文を形ごとに数え、同じ形がパラメーターを変えて繰り返されたものを記録する。
+
+    `connection.execute_wrapper()` に渡して使います。
+    しきい値に達した時点で一度だけ呼び出し元を調べるため、通常のクエリにかかる負荷は小さい。
+    """
+
+    def __init__(self, threshold=N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self.params = {}  # SQLの形 -> 実行されたパラメーターの集合
+        self.triggers = {}  # SQLの形 -> (テンプレート, コード)
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            shape = fingerprint(sql)
+            seen = self.params.setdefault(shape, set())
+            seen.add(repr(params))
+            if len(seen) == self.threshold:
+                self.triggers[shape] = find_trigger()
+        return execute(sql, params, many, context)
+
+    @property
+    def problems(self):
+        """N+1 と判定した (SQLの形, 実行回数, テンプレート, コード) のリスト"""
+        return [
+            (shape, len(self.params[shape]), template, code)
+            for shape, (template, code) in self.triggers.items()
+        ]
+
+    def report(self, label=''):
+        lines = [f'N+1 クエリを検出しました{f"（{label}）" if label else ""}:']
+        for shape, count, template, code in self.problems:
+            lines.append(f'  {count}回: {shape}')
+            lines.append(f'    テンプレート: {template or "-"} / コード: {code or "-"}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def track_queries(threshold=N_PLUS_ONE_THRESHOLD):
+    """全てのデータベース接続のクエリを `QueryShapeTracker` で記録する"""
+    tracker = QueryShapeTracker(threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(tracker))
+        yield tracker
+
+
+@contextmanager
+def assert_no_n_plus_one(label='', threshold=N_PLUS_ONE_THRESHOLD):
+    """
+    ブロック内で N+1 クエリが実行されたら `NPlusOneError` を送出するテスト用のヘルパー。
+
+    使用例:
+        with assert_no_n_plus_one('成績登録'):
+            render_to_string('scores/score_execute.html', context)
+    """
+    with track_queries(threshold) as tracker:
+        yield tracker
+    if tracker.problems:
+        raise NPlusOneError(tracker.report(label))
@@ -0,0 +1,105 @@
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.template.base import Template
+
+# ログに出力する遅いクエリ・重複クエリの件数と、SQLの最大文字数
+PROFILE_TOP_QUERIES = 5
+PROFILE_SQL_LENGTH = 500
+
+# 計測中の `RequestProfile`（ミドルウェアが入れ子で計測する場合は外側から順に並ぶ）
+current_profiles = ContextVar('current_profiles', default=())
+
+
+class RequestProfile:
+    """
+    1リクエスト分のSQL・テンプレート描画の計測結果。
+
+    `connection.execute_wrapper()` に渡すと、実行したSQLごとの時間を記録します。
+    """
+
+    def __init__(self):
+        self.queries = []  # (SQL, パラメーター, ミリ秒)
+        self.template_ms = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, (time.perf_counter() - started) * 1000))
+
+    @property
+    def sql_ms(self):
+        return sum(ms for sql, params, ms in self.queries)
+
+    def slowest_queries(self, limit=PROFILE_TOP_QUERIES):
+        """時間のかかったクエリ（遅い順）"""
+        return [
+            {'sql': sql[:PROFILE_SQL_LENGTH], 'ms': round(ms, 2)}
+            for sql, params, ms in sorted(self.queries, key=lambda query: -query[2])[:limit]
+        ]
+
+    def duplicate_queries(self, limit=PROFILE_TOP_QUERIES):
+        """同じSQL・同じパラメーターで2回以上実行されたクエリ（回数の多い順）"""
+        counts = Counter((sql, repr(params)) for sql, params, ms in self.queries)
+        return [
+            {'sql': sql[:PROFILE_SQL_LENGTH], 'count': count}
+            for (sql, params), count in counts.most_common(limit) if count > 1
+        ]
+
+    def as_dict(self):
+        return {
+            'sql_count': len(self.queries),
+            'sql_ms': round(self.sql_ms, 2),
+            'template_ms': round(self.template_ms, 2),
+            'slowest_queries': self.slowest_queries(),
+            'duplicate_queries': self.duplicate_queries(),
+        }
+
+
+def install_template_timer():
+    """
+    テンプレートの描画時間を `current_profiles` の全ての計測に加算するよう `Template._render` を置き換える。
+
+    Django がテスト実行時に `Template._render` を置き換えるのと同じ方法で、
+    `{% include %}`・`{% extends %}` で入れ子になった描画は、いちばん外側だけを数える。
+    """
+    original = Template._render
+    if getattr(original, 'profiled', False):
+        return
+
+    def _render(self, context):
+        profiles = current_profiles.get()
+        if not profiles or profiles[-1].template_depth:
+            return original(self, context)
+        profiles[-1].template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            for profile in profiles:
+                profile.template_ms += elapsed
+            profiles[-1].template_depth -= 1
+
+    _render.profiled = True
+    Template._render = _render
+
+
+@contextmanager
+def profile_request():
+    """ブロック内のSQL・テンプレート描画を計測する"""
+    profile = RequestProfile()
+    token = current_profiles.set(current_profiles.get() + (profile,))
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            yield profile
+    finally:
+        current_profiles.reset(token)
@@ -48,26 +48,83 @@ INSTALLED_APPS = [
     'attendance',
     'accounts',
     'class',
+    'api',
 ]
 
 MIDDLEWARE = [
+    'studentapp.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'studentapp.middleware.NPlusOneMiddleware',
 ]
 
+# N+1 クエリの検出（studentapp.middleware.NPlusOneMiddleware）
+# テスト実行時（studentapp.test_runner）は検出したら例外にする。
+# 本番では N_PLUS_ONE_SAMPLE_RATE の割合のリクエストだけを調べ、警告をログに出力する。
+N_PLUS_ONE_RAISE = False
+N_PLUS_ONE_SAMPLE_RATE = float(os.getenv('DJANGO_N_PLUS_ONE_SAMPLE_RATE', '0.01'))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('DJANGO_N_PLUS_ONE_THRESHOLD', '5'))
+
+# メトリクス（studentapp.middleware.MetricsMiddleware、/metrics で Prometheus のテキスト形式で公開）
+# DJANGO_METRICS_TOKEN を指定した場合、/metrics は Authorization: Bearer <トークン> のリクエストにだけ返す。
+# 本番（DEBUG=False）ではトークンが必須で、指定していない場合 /metrics は 404 を返す。
+METRICS_TOKEN = os.getenv('DJANGO_METRICS_TOKEN', '')
+
+# リクエストごとのSQL・テンプレート描画の計測（studentapp.middleware.SQLProfilingMiddleware）
+# DJANGO_SQL_PROFILE_LOG にファイルのパスを指定した場合だけ、計測結果をJSON形式で1行ずつ出力する。
+# 集計: python manage.py sql_profile_report <ファイルのパス>
+SQL_PROFILE_LOG = os.getenv('DJANGO_SQL_PROFILE_LOG', '')
+SQL_PROFILE_SAMPLE_RATE = float(os.getenv('DJANGO_SQL_PROFILE_SAMPLE_RATE', '1.0'))
+
+if SQL_PROFILE_LOG:
+    MIDDLEWARE.insert(0, 'studentapp.middleware.SQLProfilingMiddleware')
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'message': {'format': '%(message)s'},
+        },
+        'handlers': {
+            'sql_profile': {
+                'class': 'logging.FileHandler',
+                'filename': SQL_PROFILE_LOG,
+                'formatter': 'message',
+                'encoding': 'utf-8',
+            },
+        },
+        'loggers': {
+            'studentapp.sqlprofile': {
+                'handlers': ['sql_profile'],
+                'level': 'INFO',
+                'propagate': False,
+            },
+        },
+    }
+
 ROOT_URLCONF = 'studentapp.urls'
 
+# テンプレートの読み込み
+# 本番（DEBUG=False）では、解析済みのテンプレートをプロセス内に保持する cached.Loader を使う。
+# 開発時はテンプレートの編集がすぐ反映されるよう、毎回ファイルから読み込む。
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -82,6 +139,15 @@ WSGI_APPLICATION = 'studentapp.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# 接続はリクエストごとに閉じず、ワーカーのスレッドごとに DJANGO_DB_CONN_MAX_AGE 秒まで使い回す
+# （gunicorn のワーカーあたりの接続数はスレッド数。gunicorn.conf.py の GUNICORN_THREADS を参照）。
+# - DJANGO_DB_CONN_MAX_AGE: 接続を使い回す秒数（0: リクエストごとに接続する、none: 無期限）
+# - DJANGO_DB_CONN_HEALTH_CHECKS: 使い回す前に接続が生きているか確認する（既定: true）
+# - DJANGO_DB_CONNECT_TIMEOUT: 接続のタイムアウト（秒）
+# - DJANGO_DB_STATEMENT_TIMEOUT: 1つのSQLのタイムアウト（ミリ秒、0: なし）
+# エラーの起きた接続は、Django がリクエストの終了時に確認して閉じ、次のリクエストで接続し直す。
+DB_CONN_MAX_AGE = os.getenv('DJANGO_DB_CONN_MAX_AGE', '60')
+DB_STATEMENT_TIMEOUT = int(os.getenv('DJANGO_DB_STATEMENT_TIMEOUT', '0'))
 
 DATABASES = {
     'default': {
@@ -91,9 +157,93 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': os.getenv('DJANGO_DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DJANGO_DB_CONNECT_TIMEOUT', '5')),
+            # 使われていない接続がネットワーク機器に切断されないよう、TCPのキープアライブを送る
+            'keepalives': 1,
+            'keepalives_idle': 60,
+            **({'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'} if DB_STATEMENT_TIMEOUT else {}),
+        },
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# 参照データ（クラス・科目・教師）、画面の断片・成績統計のキャッシュと、それらのバージョン（ETag）に使用する。
+# バージョンを全てのプロセスで共有しないと、他のプロセスが古いデータや 304 を返し続けるため、
+# 複数のプロセス・サーバーで動かす場合は Redis などの共有キャッシュを指定する。
+# 例: DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache DJANGO_CACHE_LOCATION=redis://localhost:6379/0
+# Redis・Memcached を用意できない場合は DatabaseCache を使う（python manage.py createcachetable が必要）。
+# 例: DJANGO_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache DJANGO_CACHE_LOCATION=django_cache
+# 既定の LocMemCache はプロセスごとのため1プロセスでの開発・テスト用（gunicorn は複数ワーカーでの起動を拒否する）。
+
+CACHE_BACKEND = os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', ''),
+        # LocMemCache・ファイル・DatabaseCache は既定で300件を超えると古い項目から消すため、
+        # セッションやログインの制限の状態が消えないよう上限を上げる（Redis・Memcached はクライアントの設定のため付けない）
+        'OPTIONS': {} if CACHE_BACKEND.startswith((
+            'django.core.cache.backends.redis.', 'django.core.cache.backends.memcached.',
+        )) else {'MAX_ENTRIES': int(os.getenv('DJANGO_CACHE_MAX_ENTRIES', '1000000'))},
+    },
+}
+
+# 全てのサーバー（インスタンス）で共有されるキャッシュ。ファイル・LocMemCache はサーバーごと・プロセスごと。
+SHARED_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+# Sessions / Messages
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/#using-cached-sessions
+# 全てのサーバーで共有するキャッシュ（SHARED_CACHE_BACKENDS）がある場合、セッションはキャッシュから読み込み、
+# キャッシュにない場合だけデータベースを読む（書き込みは両方に行う）。
+# 共有キャッシュがない場合は、ログアウトしたセッションが他のサーバーのキャッシュに残らないよう、データベースだけを使う。
+# メッセージはCookieに保存し、メッセージのためにセッションを書き換えない。
+SESSION_ENGINE = os.getenv(
+    'DJANGO_SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if CACHE_BACKEND in SHARED_CACHE_BACKENDS
+    else 'django.contrib.sessions.backends.db',
+)
+SESSION_CACHE_ALIAS = 'default'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Login throttling
+# ログインの試行を、IPアドレスごと・教師番号ごとのトークンバケットで制限する（accounts/throttle.py）。
+# BURST 回までは続けて試行でき、その後は1分あたり PER_MINUTE 回ずつ回復する。
+# 学校から一斉にログインする場合は同じIPアドレスになるため、IPアドレスの制限は教師番号より緩くする。
+# 状態は全てのサーバーで共有するキャッシュに保存する（Redis では maxmemory-policy で追い出されないようにする）。
+# プロキシ・ロードバランサーの後ろで動かす場合は、信頼するプロキシの数を DJANGO_LOGIN_THROTTLE_PROXY_COUNT に指定する
+# （X-Forwarded-For の右からその数番目のアドレスを使う。0 の場合は REMOTE_ADDR）。
+#   - App Engine: 2（フロントエンドが「クライアント, ロードバランサー」の順に追加する。app.yaml で指定）
+#   - nginx（proxy_add_x_forwarded_for）の後ろの gunicorn: 1
+#   - docker-compose（runserver に直接接続）: 0
+LOGIN_THROTTLE_CACHE = 'default'
+LOGIN_THROTTLE_PROXY_COUNT = int(os.getenv('DJANGO_LOGIN_THROTTLE_PROXY_COUNT', '0'))
+LOGIN_THROTTLE_IP_BURST = int(os.getenv('DJANGO_LOGIN_THROTTLE_IP_BURST', '60'))
+LOGIN_THROTTLE_IP_PER_MINUTE = float(os.getenv('DJANGO_LOGIN_THROTTLE_IP_PER_MINUTE', '60'))
+LOGIN_THROTTLE_TEACHER_BURST = int(os.getenv('DJANGO_LOGIN_THROTTLE_TEACHER_BURST', '5'))
+LOGIN_THROTTLE_TEACHER_PER_MINUTE = float(os.getenv('DJANGO_LOGIN_THROTTLE_TEACHER_PER_MINUTE', '1'))
+
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# PBKDF2 の反復回数（既定は Django 4.2 と同じ 600000）。小さいインスタンスでログインのCPU負荷を抑える場合は下げる。
+# 変更後は、各教師の次回ログイン時に新しい回数でハッシュし直す。
+PASSWORD_HASH_ITERATIONS = int(os.getenv('DJANGO_PASSWORD_HASH_ITERATIONS', '600000'))
+PASSWORD_HASHERS = [
+    'accounts.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -128,12 +278,28 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
+# collectstatic でファイル名に内容のハッシュを付け（style.3f2a1c.css など）、gzip・brotli で圧縮したファイルも書き出す。
+# WhiteNoiseMiddleware が Accept-Encoding に応じて圧縮したファイルを返し、
+# ハッシュ付きのファイルは内容が変わらないため、1年以上キャッシュしてよい（immutable）ヘッダーを付ける。
+# collectstatic はデプロイ時に必須（Dockerfile・deploy.sh で実行する）。STATIC_ROOT はリポジトリに含めず、
+# マニフェスト（staticfiles.json）がない場合、gunicorn は起動を拒否する。
+
 STATIC_URL = '/static/'
-STATIC_ROOT = '/home/ec2-user/portfolio3/staticfiles/'
+STATIC_ROOT = os.getenv('DJANGO_STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
 
 STATICFILES_DIRS = (
     os.path.join(BASE_DIR, 'static'),
 )
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -141,6 +307,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.Teacher'
 
+TEST_RUNNER = 'studentapp.test_runner.TestRunner'
+
 LOGOUT_REDIRECT_URL = 'accounts:login'  # ログアウト後に遷移するURL。ここでは'login'という名前のURLにリダイレクトされます
 
 LOGIN_URL = 'students:home'  # ログアウト状態でログインしないと表示できないページを表示させようとした時に遷移するURL。
@@ -0,0 +1,42 @@
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    プロジェクトのテストランナー。
+
+    テスト実行中は `NPlusOneMiddleware` が全てのリクエストを調べ、
+    N+1 クエリを検出したら `NPlusOneError` を送出してテストを失敗させます。
+    静的ファイルは一時ディレクトリに collectstatic し、本番と同じくマニフェストからハッシュ付きのURLを作ります
+    （マニフェストにないファイルを参照するとテストが失敗する）。時間のかかる圧縮は StaticFilesTests で確認します。
+    セッションは、本番（共有キャッシュあり）と同じくキャッシュを使う cached_db にし、同じクエリ数で計測します
+    （テストは1プロセスのため、LocMemCache でもログアウトしたセッションが残ることはない）。
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.saved_n_plus_one = (settings.N_PLUS_ONE_RAISE, settings.N_PLUS_ONE_SAMPLE_RATE)
+        settings.N_PLUS_ONE_RAISE = True
+        settings.N_PLUS_ONE_SAMPLE_RATE = 1.0
+        self.static_root = tempfile.TemporaryDirectory()
+        self.test_settings = override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+            },
+            STATIC_ROOT=self.static_root.name,
+            SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+        )
+        self.test_settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        self.static_root.cleanup()
+        settings.N_PLUS_ONE_RAISE, settings.N_PLUS_ONE_SAMPLE_RATE = self.saved_n_plus_one
+        super().teardown_test_environment(**kwargs)
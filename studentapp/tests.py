@@ -0,0 +1,545 @@
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.messages import constants as message_constants
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+from django.template import Context, Engine
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from accounts.models import Teacher
+from attendance.models import Attendance, add_monthly_attendance
+from scores.stats import invalidate_all_score_statistics
+from students.models import Course, Score, Student, Subject, sync_student_id_sequence
+from students.reference import get_courses, get_subjects, get_teacher_names, invalidate, version_key
+from .middleware import NPlusOneMiddleware, SQLProfilingMiddleware
+from .nplusone import NPlusOneError, assert_no_n_plus_one, fingerprint
+
+# ビューごとの計測結果を書き出すファイル（実行のたびに上書き）
+VIEW_TIMINGS_FILE = os.getenv('VIEW_TIMINGS_FILE', os.path.join(settings.BASE_DIR, 'view_timings.json'))
+
+
+def class_roster(class_id='101'):
+    """クラスの学生番号一覧（POSTデータの組み立て用）"""
+    return list(Student.objects.filter(class_id=class_id).order_by('student_id').values_list('student_id', flat=True))
+
+
+# (ケース名, メソッド, URL名, URL引数, POSTデータを返す関数, クエリ数の上限)
+# クエリ数はユーザーの取得を含む（セッションはキャッシュから読むため含まない）。データ量が増えても変わらないこと。
+VIEW_CASES = [
+    ('home', 'get', 'students:home', (), None, 1),
+    ('index', 'get', 'students:index', (), None, 1),
+    ('stu_list', 'get', 'students:stu_list', (), None, 2),
+    ('stu_export', 'get', 'students:stu_export', (), None, 4),
+    ('stu_create', 'get', 'students:stu_create', (), None, 2),
+    ('stu_create_post', 'post', 'students:stu_create', (), lambda: {
+        'next': 'create', 'last_name': '長野', 'first_name': '花子', 'ent_year': '2024', 'class_id': '101',
+        'postalcode': '3800921', 'address1': '長野県長野市栗田123', 'phone_number': '09012345678',
+    }, 5),
+    ('stu_import', 'get', 'students:stu_import', (), None, 1),
+    ('stu_detail', 'post', 'students:stu_detail', (), lambda: {'student_pk': '0000000001'}, 2),
+    ('stu_update', 'post', 'students:stu_update', (), lambda: {'student_pk': '0000000001', 'next': 'update_page'}, 3),
+    ('login', 'get', 'accounts:login', (), None, 1),
+    ('at_search', 'get', 'attendance:at_search', (), None, 1),
+    ('at_search_post', 'post', 'attendance:at_search', (), lambda: {'year': '2024', 'class': '101', 'day': '2024-12-05'}, 2),
+    ('at_export', 'get', 'attendance:at_export', (), None, 4),
+    ('at_report', 'get', 'attendance:at_report', (), lambda: {'year': '2024', 'class': '101', 'school_year': '2024'}, 3),
+    ('at_insert', 'post', 'attendance:at_insert', (), lambda: dict(
+        {'select_day': '2024-12-06'}, **{f'at_id_{student_id}': '2' for student_id in class_roster()}
+    ), 10),
+    ('score_list', 'get', 'scores:score_list', (), None, 1),
+    ('score_list_post', 'post', 'scores:score_list', (), lambda: {'year': '2024', 'class': '101', 'subject': 'A01'}, 2),
+    ('score_export', 'get', 'scores:score_export', (), None, 4),
+    ('score_stats', 'get', 'scores:score_stats', (), lambda: {'year': '2024', 'class': '101', 'subject': 'A01'}, 3),
+    ('score_execute', 'post', 'scores:score_execute', (), lambda: dict(
+        {'select_class': '101', 'select_year': '2024', 'select_sub': 'A01'},
+        **{f'score_{student_id}': '75' for student_id in class_roster()}
+    ), 9),
+    ('sub_list', 'get', 'scores:sub_list', (), None, 1),
+    ('sub_create', 'get', 'scores:sub_create', (), None, 1),
+    ('sub_update', 'get', 'scores:sub_update', ('A01',), None, 2),
+    ('sub_delete', 'get', 'scores:sub_delete', ('A01',), None, 2),
+    ('cls_list', 'get', 'class:cls_list', (), None, 1),
+    ('cls_create', 'get', 'class:cls_create', (), None, 2),
+    ('cls_update', 'get', 'class:cls_update', ('101',), None, 3),
+    ('cls_delete', 'get', 'class:cls_delete', ('101',), None, 2),
+    ('api_students', 'get', 'api:api_list', ('students',), lambda: {'year': '2024', 'class': '101'}, 2),
+    ('api_scores', 'get', 'api:api_list', ('scores',), lambda: {'year': '2024', 'class': '101', 'subject': 'A01'}, 2),
+    ('metrics', 'get', 'metrics', (), None, 0),
+    ('logout', 'post', 'accounts:logout', (), None, 3),
+]
+
+
+@override_settings(METRICS_TOKEN='secret')
+class ViewQueryBudgetTests(TestCase):
+    """
+    全ビューのクエリ数・応答時間の回帰テスト。
+
+    少量のデータと大量のデータの両方で studentapp/urls.py の各URLを呼び出し、
+    クエリ数が上限どおりでデータ量に依存しないことを確認します。
+    応答時間は VIEW_TIMINGS_FILE にJSONで書き出します。
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', is_staff=True, teacher_name='長野')
+        Course.objects.create(class_id='101', course_name='システム開発コース', teacher_id=cls.teacher)
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+
+    def seed(self, classes, students_per_class):
+        """クラスを追加し、追加したクラスとクラス101に学生・点数・出欠データを作成する"""
+        first_teacher = Teacher.objects.count() + 1
+        teachers = Teacher.objects.bulk_create([
+            Teacher(teacher_id=first_teacher + i, teacher_name='教師') for i in range(classes)
+        ])
+        first_class = Course.objects.count() + 101
+        courses = Course.objects.bulk_create([
+            Course(class_id=str(first_class + i), course_name='コース', teacher_id=teacher)
+            for i, teacher in enumerate(teachers)
+        ])
+        courses.append(Course.objects.get(class_id='101'))
+        first_student = Student.objects.count() + 1
+        students = Student.objects.bulk_create([
+            Student(
+                student_id=str(first_student + i * students_per_class + j).zfill(10),
+                last_name='長野', first_name='太郎', postalcode='3800921', ent_year=2024, class_id=course,
+                absence_day=Decimal('0.0'),
+            )
+            for i, course in enumerate(courses)
+            for j in range(students_per_class)
+        ])
+        sync_student_id_sequence()
+        # bulk_create ではシグナルが送られないため、参照データのキャッシュは明示的に無効にする
+        invalidate(Teacher)
+        invalidate(Course)
+        invalidate_all_score_statistics()
+        Score.objects.bulk_create([Score(student_id=student, subject_id_id='A01', score=60) for student in students])
+        add_monthly_attendance(Attendance.objects.bulk_create([
+            Attendance(student_id=student, attendance_date='2024-12-05', attendance_id=1) for student in students
+        ]))
+
+    def run_cases(self, label, timings):
+        # 参照データはキャッシュ済みの状態（通常運用時）で計測する
+        get_courses(), get_subjects(), get_teacher_names()
+        for name, method, url_name, args, data, budget in VIEW_CASES:
+            with self.subTest(view=name, dataset=label):
+                self.client.force_login(self.teacher)
+                url = reverse(url_name, args=args)
+                request_data = data() if data else {}
+                started = time.perf_counter()
+                with self.assertNumQueries(budget) as queries:
+                    response = getattr(self.client, method)(url, request_data, HTTP_AUTHORIZATION='Bearer secret')
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+                self.assertLess(response.status_code, 400)
+                timing = timings.setdefault(name, {'queries': budget})
+                timing[label] = round(elapsed * 1000, 2)
+                # セッションの読み書き（django_session テーブル）のクエリ数
+                timing['session_queries'] = sum('"django_session"' in query['sql'] for query in queries)
+
+    def test_query_budget_is_flat_as_data_grows(self):
+        timings = {}
+        self.seed(classes=1, students_per_class=5)
+        self.run_cases('small', timings)
+        self.seed(classes=30, students_per_class=100)
+        self.run_cases('large', timings)
+
+        with open(VIEW_TIMINGS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(timings, f, ensure_ascii=False, indent=2)
+
+
+class ConditionalPageTests(TestCase):
+    """一覧画面の条件付きレスポンス（ETag・Last-Modified）のテスト"""
+
+    PAGES = ['class:cls_list', 'scores:sub_list', 'students:stu_list']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', teacher_name='長野')
+        cls.other = Teacher.objects.create_user(teacher_id=2, password='pass', teacher_name='松本')
+        course = Course.objects.create(class_id='101', course_name='システム開発コース', teacher_id=cls.teacher)
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+        Student.objects.create(student_id='0000000001', last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+
+    def revalidate(self, url_name, response):
+        return self.client.get(
+            reverse(url_name),
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_unchanged_pages_return_304_without_queries(self):
+        for url_name in self.PAGES:
+            with self.subTest(page=url_name):
+                response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertTrue(response.has_header('Last-Modified'))
+
+                # 教師の取得だけで、一覧の取得・描画はしない
+                with self.assertNumQueries(1):
+                    self.assertEqual(self.revalidate(url_name, response).status_code, 304)
+
+    def test_changes_invalidate_the_matching_pages(self):
+        responses = {url_name: self.client.get(reverse(url_name)) for url_name in self.PAGES}
+        Subject.objects.create(subject_id='A02', subject_name='英語')
+
+        self.assertEqual(self.revalidate('scores:sub_list', responses['scores:sub_list']).status_code, 200)
+        self.assertEqual(self.revalidate('class:cls_list', responses['class:cls_list']).status_code, 304)
+
+        Student.objects.filter(pk='0000000001').get().save()
+        self.assertEqual(self.revalidate('students:stu_list', responses['students:stu_list']).status_code, 200)
+
+    def test_changes_in_other_workers_invalidate_the_pages(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            **settings.CACHES,
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        }):
+            page = self.client.get(reverse('class:cls_list'))
+            api_url = reverse('api:api_list', args=('courses',))
+            api = self.client.get(api_url)
+
+            # 他のワーカーが、共有キャッシュのクラスのバージョンを進める
+            FileBasedCache(location, {}).incr(version_key(Course))
+
+            self.assertEqual(self.revalidate('class:cls_list', page).status_code, 200)
+            self.assertEqual(self.client.get(api_url, HTTP_IF_NONE_MATCH=api['ETag']).status_code, 200)
+
+    def test_other_teacher_and_pending_messages_get_a_fresh_page(self):
+        response = self.client.get(reverse('scores:sub_list'))
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.revalidate('scores:sub_list', response).status_code, 200)
+
+        # 登録完了メッセージなど、表示待ちのメッセージがあれば描画する
+        response = self.client.get(reverse('scores:sub_list'))
+        storage = CookieStorage(HttpRequest())
+        storage.add(message_constants.SUCCESS, '科目を登録しました。')
+        message_response = HttpResponse()
+        storage.update(message_response)
+        self.client.cookies[storage.cookie_name] = message_response.cookies[storage.cookie_name].value
+
+        response = self.revalidate('scores:sub_list', response)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '科目を登録しました。')
+
+
+class NPlusOneDetectionTests(TestCase):
+    """N+1 クエリ検出（studentapp.nplusone・NPlusOneMiddleware）のテスト"""
+
+    TEMPLATE = '{% for score in scores %}\n{{ score.student_id.last_name }}\n{% endfor %}'
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+        for i in range(1, 7):
+            student = Student.objects.create(student_id=str(i).zfill(10), last_name='長野', class_id=course)
+            Score.objects.create(student_id=student, subject_id_id='A01', score=60)
+
+    def render_scores(self, scores):
+        return Engine.get_default().from_string(self.TEMPLATE).render(Context({'scores': scores}))
+
+    def test_fingerprint_ignores_parameter_count(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s,  %s)'),
+            fingerprint('SELECT *\n FROM t WHERE id IN (%s)'),
+        )
+
+    def test_lazy_relation_in_template_is_reported(self):
+        with self.assertRaises(NPlusOneError) as raised:
+            with assert_no_n_plus_one('成績'):
+                self.render_scores(Score.objects.order_by('id'))
+        report = str(raised.exception)
+        self.assertIn('（成績）', report)
+        self.assertIn('6回: SELECT', report)
+        # テンプレートの行（2行目の {{ score.student_id.last_name }}）と、描画を呼び出したコード
+        self.assertIn('テンプレート: <unknown source>:2', report)
+        self.assertIn('studentapp/tests.py', report)
+
+        with assert_no_n_plus_one():
+            self.render_scores(Score.objects.select_related('student_id').order_by('id'))
+
+    def test_middleware_raises_or_logs(self):
+        def view(request):
+            return HttpResponse(self.render_scores(Score.objects.order_by('id')))
+
+        middleware = NPlusOneMiddleware(view)
+        request = RequestFactory().get('/scores/')
+        with override_settings(N_PLUS_ONE_RAISE=True):
+            with self.assertRaises(NPlusOneError):
+                middleware(request)
+
+        with override_settings(N_PLUS_ONE_RAISE=False, N_PLUS_ONE_SAMPLE_RATE=1.0):
+            with self.assertLogs('studentapp.nplusone', 'WARNING') as logs:
+                self.assertEqual(middleware(request).status_code, 200)
+        self.assertIn('GET /scores/', logs.output[0])
+
+        # 調べる対象に選ばれなかったリクエストは記録しない
+        with override_settings(N_PLUS_ONE_RAISE=False, N_PLUS_ONE_SAMPLE_RATE=0):
+            with self.assertNoLogs('studentapp.nplusone'):
+                middleware(request)
+
+
+class SQLProfilingTests(TestCase):
+    """SQLプロファイル（SQLProfilingMiddleware・sql_profile_report）のテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', teacher_name='長野')
+        Course.objects.create(class_id='101', course_name='システム開発コース', teacher_id=cls.teacher)
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+
+    def profile(self, *url_names):
+        """`url_names` の画面を計測し、出力されたログ（JSON）のリストを返す"""
+        self.client.force_login(self.teacher)
+        middleware = ['studentapp.middleware.SQLProfilingMiddleware'] + settings.MIDDLEWARE
+        with self.settings(MIDDLEWARE=middleware), self.assertLogs('studentapp.sqlprofile', 'INFO') as logs:
+            for url_name in url_names:
+                self.client.get(reverse(url_name))
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_request_is_logged_as_json(self):
+        cache.clear()
+        record, = self.profile('scores:score_list')
+        self.assertEqual(record['view'], 'scores:score_list')
+        self.assertEqual(record['status'], 200)
+        # ユーザーに加え、キャッシュが空のためクラス・科目を読み込む
+        self.assertEqual(record['sql_count'], 3)
+        self.assertEqual(len(record['slowest_queries']), 3)
+        self.assertEqual(record['duplicate_queries'], [])
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreaterEqual(record['duration_ms'], record['template_ms'])
+
+    def test_duplicate_queries_are_reported(self):
+        def view(request):
+            Subject.objects.get(subject_id='A01')
+            Subject.objects.get(subject_id='A01')
+            return HttpResponse()
+
+        with self.assertLogs('studentapp.sqlprofile', 'INFO') as logs:
+            SQLProfilingMiddleware(view)(RequestFactory().get('/'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['sql_count'], 2)
+        self.assertEqual(record['duplicate_queries'][0]['count'], 2)
+
+    def test_report_summarizes_endpoints(self):
+        records = self.profile('scores:score_list', 'scores:score_list', 'class:cls_list')
+        with tempfile.NamedTemporaryFile('w', suffix='.log', encoding='utf-8', delete=False) as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.write('壊れた行\n')
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('sql_profile_report', f.name, stdout=out, stderr=err)
+        os.remove(f.name)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith('(全体)'))
+        self.assertRegex(out.getvalue(), r'scores:score_list\s+2 ')
+        self.assertRegex(out.getvalue(), r'class:cls_list\s+1 ')
+        self.assertIn('遅いクエリ:', out.getvalue())
+        self.assertIn('4行目', err.getvalue())
+
+
+class MetricsTests(TestCase):
+    """メトリクス（MetricsMiddleware・/metrics）のテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', teacher_name='長野')
+        Course.objects.create(class_id='101', course_name='システム開発コース', teacher_id=cls.teacher)
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('scores:score_list'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="3 queries", tpl;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_are_exposed_in_prometheus_format(self):
+        self.client.get(reverse('scores:score_list'))
+        self.client.get(reverse('scores:score_list'))
+        self.client.get('/no-such-page/')
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response['Content-Type'], CONTENT_TYPE_LATEST)
+        body = response.content.decode()
+        self.assertRegex(
+            body, r'studentapp_request_duration_seconds_count\{method="GET",view="scores:score_list"\} [2-9]'
+        )
+        self.assertIn('studentapp_requests_total{method="GET",status="404",view="unresolved"}', body)
+        self.assertRegex(body, r'studentapp_db_queries_total\{view="scores:score_list"\} \d')
+        self.assertRegex(body, r'studentapp_cache_requests_total\{cache="courses",result="hit"\} [1-9]')
+        self.assertRegex(body, r'studentapp_cache_requests_total\{cache="courses",result="miss"\} [1-9]')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_are_hidden_in_production_without_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class SessionStorageTests(TestCase):
+    """キャッシュを使うセッション・Cookieに保存するメッセージのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', teacher_name='長野')
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_messages_do_not_write_session(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('scores:sub_update', args=['A01']),
+                {'subject_id': 'A01', 'subject_name': '数学Ⅰ', 'next': 'update'},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(any('"django_session"' in query['sql'] for query in queries))
+        self.assertIn(CookieStorage.cookie_name, response.cookies)
+
+        response = self.client.get(reverse('scores:sub_list'))
+        self.assertContains(response, '科目情報を変更しました。')
+
+    def test_logout_removes_cached_session(self):
+        session_cache = caches[settings.SESSION_CACHE_ALIAS]
+        cache_key = SessionStore(self.client.session.session_key).cache_key
+        self.assertIsNotNone(session_cache.get(cache_key))
+
+        response = self.client.post(reverse('accounts:logout'), follow=True)
+        self.assertIsNone(session_cache.get(cache_key))
+        # セッションを削除した後でも、ログアウトのメッセージは表示される
+        self.assertContains(response, 'ログアウトしました。')
+
+
+class GunicornConfigTests(TestCase):
+    """gunicorn.conf.py の起動時の確認（キャッシュ・静的ファイル）のテスト"""
+
+    def check(self, workers, check='check_shared_cache'):
+        # 読み込み時に設定する環境変数（PROMETHEUS_MULTIPROC_DIR）を、テストの後に戻す
+        with mock.patch.dict(os.environ):
+            spec = importlib.util.spec_from_file_location('gunicorn_conf', settings.BASE_DIR / 'gunicorn.conf.py')
+            config = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(config)
+            getattr(config, check)(SimpleNamespace(cfg=SimpleNamespace(workers=workers)))
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.check(workers=1)
+            with self.assertRaisesMessage(RuntimeError, 'LocMemCache'):
+                self.check(workers=2)
+        # キャッシュに保存するセッションは、サーバーごとのキャッシュでは使えない
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+            with self.assertRaisesMessage(RuntimeError, 'セッション'):
+                self.check(workers=1)
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}},
+        ):
+            self.check(workers=4)
+
+    def test_missing_static_manifest_is_refused(self):
+        # テストランナーが collectstatic した STATIC_ROOT にはマニフェストがある
+        self.check(workers=1, check='check_static_manifest')
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            with self.assertRaisesMessage(RuntimeError, 'collectstatic'):
+                self.check(workers=1, check='check_static_manifest')
+
+
+class StaticFilesTests(TestCase):
+    """ハッシュ付き・圧縮済みの静的ファイル（collectstatic・WhiteNoise）のテスト"""
+
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(source.name, 'css'))
+        with open(os.path.join(source.name, 'css', 'style.css'), 'w') as f:
+            f.write('body { background: url("../img/logo.png"); }\n' * 100)
+        os.makedirs(os.path.join(source.name, 'img'))
+        with open(os.path.join(source.name, 'img', 'logo.png'), 'wb') as f:
+            f.write(b'\x89PNG')
+
+        storage = {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'}
+        overrides = override_settings(
+            STATIC_ROOT=root.name,
+            STATICFILES_DIRS=[source.name],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={**settings.STORAGES, 'staticfiles': storage},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.root = root.name
+
+    def test_files_are_hashed_and_precompressed(self):
+        url = static('css/style.css')
+        self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, url.removeprefix('/static/'))
+        for suffix in ('', '.gz', '.br'):
+            self.assertTrue(os.path.exists(path + suffix), path + suffix)
+        # CSS の中の url() もハッシュ付きのファイル名に書き換える
+        with open(path) as f:
+            self.assertRegex(f.read(), r'url\("\.\./img/logo\.[0-9a-f]{12}\.png"\)')
+
+    def test_static_tag_uses_manifest(self):
+        with open(os.path.join(self.root, 'staticfiles.json')) as f:
+            paths = json.load(f)['paths']
+        template = Engine(libraries={'static': 'django.templatetags.static'}).from_string(
+            "{% load static %}{% static 'css/style.css' %}"
+        )
+        self.assertEqual(template.render(Context()), '/static/' + paths['css/style.css'])
+
+    def test_missing_manifest_is_an_error(self):
+        """マニフェストがない場合（collectstatic を実行していない場合）は、ハッシュのないURLを返さずエラーにする"""
+        os.remove(os.path.join(self.root, 'staticfiles.json'))
+        # 保存先を作り直し、読み込み済みのマニフェストを捨てる
+        with override_settings(STATIC_ROOT=self.root):
+            with self.assertRaisesMessage(ValueError, 'Missing staticfiles manifest entry'):
+                static('css/style.css')
+
+    def test_hashed_files_are_served_compressed_with_long_cache(self):
+        url = static('css/style.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(response['Cache-Control'], 'max-age=315360000, public, immutable')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
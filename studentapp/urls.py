@@ -16,8 +16,8 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
-from django.conf import settings
+
+from .metrics import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,6 +26,6 @@ urlpatterns = [
     path('attendance/',include('attendance.urls')),
     path('scores/',include('scores.urls')),
     path('class/',include('class.urls')),
+    path('api/',include('api.urls')),
+    path('metrics',MetricsView,name='metrics'),
 ]
-
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
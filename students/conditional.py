@@ -0,0 +1,56 @@
+import datetime
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .reference import get_last_modified, get_version
+
+
+def conditional_page(*models):
+    """
+    一覧画面に ETag・Last-Modified を付け、変更がなければ 304 Not Modified を返すデコレーター。
+
+    ETag と最終更新日時は `models` のバージョン（`students.reference`）から作るため、
+    データが変わっていなければ、一覧の取得もテンプレートの描画も行いません。
+    バージョンは全てのワーカーで共有するキャッシュ（CACHES['default']）から毎回読むため、
+    他のワーカーでの変更後に古い 304 を返すことはありません。
+    ログインした教師ごとに表示が異なるため、ETag には教師と最終ログイン日時を含め、
+    ブラウザだけがキャッシュするよう `Cache-Control: private, no-cache` を付けます。
+    表示待ちのメッセージがある場合は、必ず描画します。
+
+    使用例:
+        @login_required
+        @conditional_page(Course, Teacher)
+        def ClassListView(request):
+            ...
+    """
+    def etag(request, *args, **kwargs):
+        versions = ':'.join(str(get_version(model)) for model in models)
+        # 入学年度の選択肢など、日付によって変わる表示があるため日付も含める
+        key = (
+            f'{versions}:{request.user.pk}:{request.user.last_login}:'
+            f'{request.get_full_path()}:{datetime.date.today()}'
+        )
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        modified = max(get_last_modified(model) for model in models)
+        if request.user.last_login:
+            modified = max(modified, request.user.last_login.timestamp())
+        return datetime.datetime.fromtimestamp(modified, tz=datetime.timezone.utc)
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
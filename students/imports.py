@@ -0,0 +1,215 @@
+import csv
+import datetime
+import io
+
+from django.db import transaction
+
+from attendance.models import ATTENDANCE_CATEGORIES, Attendance, add_absence_days, add_monthly_attendance
+from .forms import StudentCreateForm
+from .models import Score, Student, allocate_student_ids
+from scores.stats import invalidate_all_score_statistics
+from .reference import get_courses, get_subject_names, invalidate
+
+# 1回の検証・書き込みで扱う行数
+IMPORT_BATCH_SIZE = 1000
+
+# encoding パラメータと読み込みに使う文字コードの対応（utf-8 はBOM付きのファイルも読めるようにする）
+IMPORT_ENCODINGS = {
+    'utf-8': 'utf-8-sig',
+    'cp932': 'cp932',
+}
+
+
+class ImportResult:
+    """CSV取込の結果（登録件数と行ごとのエラー）"""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # (行番号, エラーメッセージのリスト)
+
+    def add_error(self, line, messages):
+        self.errors.append((line, messages))
+
+
+class StudentImportForm(StudentCreateForm):
+    """
+    CSV取込用の学生フォーム。
+
+    `StudentCreateForm` と同じ検証を行うが、クラスの存在チェックは1行ごとにクエリを発行しないよう、
+    取込処理側でまとめて行う。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        del self.fields['class_id']
+
+
+def read_csv(file, encoding='utf-8'):
+    """
+    アップロードされたファイル（バイナリ）を読み込み、(行番号, 行データ) を順に返す。
+
+    見出し行はモデルのフィールド名（last_name など）と項目名（氏名 など）のどちらでもよい。
+    `encoding` は `IMPORT_ENCODINGS` のいずれか（それ以外は KeyError）。
+    """
+    text = io.TextIOWrapper(file, encoding=IMPORT_ENCODINGS[encoding], newline='')
+    reader = csv.DictReader(text)
+    field_names = {}
+    for model in (Student, Score, Attendance):
+        for field in model._meta.get_fields():
+            if hasattr(field, 'verbose_name'):
+                field_names[str(field.verbose_name)] = field.name
+    for row in reader:
+        yield reader.line_num, {field_names.get(key, key): (value or '').strip() for key, value in row.items() if key}
+
+
+def batches(rows, size=IMPORT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_students(rows, dry_run=False):
+    """
+    学生のCSV取込。
+
+    各行を `StudentCreateForm` と同じ規則（必須項目・郵便番号・電話番号の形式）で検証し、
+    クラスの存在は最初に1クエリでまとめて確認します。
+    正しい行だけを1つのトランザクション内で `bulk_create` します。
+    検証のみ（dry_run）の場合は、学生番号を採番すると欠番になるため、採番・登録せずに件数だけを数えます。
+    """
+    result = ImportResult()
+    course_ids = {course.class_id for course in get_courses()}
+    with transaction.atomic():
+        for batch in batches(rows):
+            students = []
+            for line, row in batch:
+                form = StudentImportForm(row)
+                errors = [f'{key}: {message}' for key, messages in form.errors.items() for message in messages]
+                if row.get('class_id') not in course_ids:
+                    errors.append(f"class_id: クラス番号「{row.get('class_id', '')}」は存在しません。")
+                if errors:
+                    result.add_error(line, errors)
+                    continue
+                student = form.save(commit=False)
+                student.class_id_id = row['class_id']
+                student.attend_flag = True
+                students.append(student)
+            if dry_run:
+                result.created += len(students)
+                continue
+            for student, student_id in zip(students, allocate_student_ids(len(students))):
+                student.student_id = student_id
+            Student.objects.bulk_create(students)
+            result.created += len(students)
+        if dry_run:
+            transaction.set_rollback(True)
+        elif result.created:
+            invalidate(Student)
+    return result
+
+
+def import_scores(rows, dry_run=False):
+    """
+    点数のCSV取込。
+
+    学生の存在はバッチごとに1クエリ、科目の存在は最初に1クエリでまとめて確認し、
+    正しい行を `bulk_create(update_conflicts=True)` で登録・更新します。
+    """
+    result = ImportResult()
+    subject_ids = set(get_subject_names())
+    with transaction.atomic():
+        for batch in batches(rows):
+            student_ids = set(Student.objects.filter(
+                student_id__in=[row.get('student_id') for line, row in batch]
+            ).values_list('student_id', flat=True))
+            scores = {}
+            for line, row in batch:
+                errors = []
+                if row.get('student_id') not in student_ids:
+                    errors.append(f"student_id: 学生番号「{row.get('student_id', '')}」は存在しません。")
+                if row.get('subject_id') not in subject_ids:
+                    errors.append(f"subject_id: 科目番号「{row.get('subject_id', '')}」は存在しません。")
+                try:
+                    score = int(row.get('score', ''))
+                    if not 0 <= score <= 100:
+                        raise ValueError
+                except ValueError:
+                    errors.append('score: 点数は0～100の整数で入力してください。')
+                if errors:
+                    result.add_error(line, errors)
+                    continue
+                # 同じ学生・科目が複数行ある場合は後の行を採用する
+                scores[(row['student_id'], row['subject_id'])] = Score(
+                    student_id_id=row['student_id'], subject_id_id=row['subject_id'], score=score
+                )
+            Score.objects.bulk_create(
+                scores.values(),
+                update_conflicts=True,
+                unique_fields=['student_id', 'subject_id'],
+                update_fields=['score'],
+            )
+            result.created += len(scores)
+        if dry_run:
+            transaction.set_rollback(True)
+        elif result.created:
+            invalidate(Score)
+            # 複数のクラス・科目にまたがるため、成績統計のキャッシュはまとめて無効にする
+            invalidate_all_score_statistics()
+    return result
+
+
+def import_attendance(rows, dry_run=False):
+    """
+    出欠席のCSV取込。
+
+    学生の存在はバッチごとに1クエリでまとめて確認し、正しい行を `bulk_create` で登録します。
+    欠席累計（`absence_day`）と月別集計（`AttendanceMonthly`）も出欠席登録画面と同じ規則で、バッチごとにまとめて加算します。
+    """
+    result = ImportResult()
+    with transaction.atomic():
+        for batch in batches(rows):
+            student_ids = set(Student.objects.filter(
+                student_id__in=[row.get('student_id') for line, row in batch]
+            ).values_list('student_id', flat=True))
+            attendances = []
+            for line, row in batch:
+                errors = []
+                if row.get('student_id') not in student_ids:
+                    errors.append(f"student_id: 学生番号「{row.get('student_id', '')}」は存在しません。")
+                try:
+                    attendance_date = datetime.date.fromisoformat(row.get('attendance_date', ''))
+                except ValueError:
+                    errors.append('attendance_date: 日付はYYYY-MM-DDの形式で入力してください。')
+                try:
+                    category = int(row.get('attendance_id', ''))
+                    if category not in ATTENDANCE_CATEGORIES:
+                        raise ValueError
+                except ValueError:
+                    errors.append('attendance_id: 分類は1～4で入力してください。')
+                if errors:
+                    result.add_error(line, errors)
+                    continue
+                attendances.append(Attendance(
+                    student_id_id=row['student_id'], attendance_date=attendance_date, attendance_id=category
+                ))
+            Attendance.objects.bulk_create(attendances)
+            add_monthly_attendance(attendances)
+            add_absence_days((attendance.student_id_id, attendance.attendance_id) for attendance in attendances)
+            result.created += len(attendances)
+        if dry_run:
+            transaction.set_rollback(True)
+        elif result.created:
+            invalidate(Attendance)
+    return result
+
+
+IMPORTERS = {
+    'students': import_students,
+    'scores': import_scores,
+    'attendance': import_attendance,
+}
@@ -0,0 +1,83 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from accounts.models import Teacher
+from .sql_profile_report import percentile
+
+
+class Command(BaseCommand):
+    """
+    起動中のサーバー（gunicorn など）に同時にリクエストを送り、1秒あたりのリクエスト数と応答時間を計測するコマンド。
+
+    データベース接続の設定（DJANGO_DB_CONN_MAX_AGE など）やワーカー数を変えて起動したサーバーに対して実行し、
+    結果を比較します。`--teacher` を指定すると、その教師でログインした状態でリクエストを送ります。
+
+    使用例:
+        python manage.py benchmark_http http://localhost:8000/scores/ --teacher 1 --requests 2000 --concurrency 8
+    """
+    help = '起動中のサーバーの、1秒あたりのリクエスト数と応答時間のパーセンタイルを計測します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='リクエストを送るURL')
+        parser.add_argument('--requests', type=int, default=1000, help='リクエストの総数')
+        parser.add_argument('--concurrency', type=int, default=8, help='同時に送るリクエスト数')
+        parser.add_argument('--teacher', type=int, help='ログインする教師番号')
+
+    def session_cookie(self, teacher_id):
+        """教師でログインしたセッションを作成し、Cookieヘッダーの値を返す"""
+        teacher = Teacher.objects.filter(teacher_id=teacher_id).first()
+        if teacher is None:
+            raise CommandError(f'教師番号「{teacher_id}」は存在しません。')
+        client = Client()
+        client.force_login(teacher)
+        return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['teacher'] is not None:
+            headers['Cookie'] = self.session_cookie(options['teacher'])
+
+        remaining = iter(range(options['requests']))
+        lock = threading.Lock()
+        elapsed = []
+        errors = []
+
+        def worker():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(urllib.request.Request(options['url'], headers=headers)) as response:
+                        response.read()
+                except (urllib.error.URLError, OSError) as e:
+                    with lock:
+                        errors.append(e)
+                    continue
+                with lock:
+                    elapsed.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        total = time.perf_counter() - started
+
+        if not elapsed:
+            raise CommandError(f'全てのリクエストが失敗しました: {errors[0] if errors else ""}')
+        elapsed.sort()
+        self.stdout.write(
+            f'{len(elapsed)}件 ({len(errors)}件失敗) {total:.2f}秒: {len(elapsed) / total:.1f} req/s, '
+            f'p50 {statistics.median(elapsed):.1f}ms, p95 {percentile(elapsed, 95):.1f}ms, '
+            f'p99 {percentile(elapsed, 99):.1f}ms'
+        )
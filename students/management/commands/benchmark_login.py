@@ -0,0 +1,92 @@
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.models import Teacher
+from .sql_profile_report import percentile
+
+
+class Command(BaseCommand):
+    """
+    ログイン画面に同時にログインを試行し、1秒あたりの試行数と応答時間、結果の内訳を計測するコマンド。
+
+    サーバーは起動せず、このプロセス内でログインのビューを呼び出します。
+    パスワードのハッシュの反復回数（DJANGO_PASSWORD_HASH_ITERATIONS）やログインの制限の設定を変えて実行し、
+    結果を比較します。`--wrong` で間違ったパスワードの割合を、`--ips` で送信元のIPアドレスの数を指定します。
+
+    使用例:
+        python manage.py benchmark_login --teacher 1 --password pass --requests 200 --concurrency 8 --wrong 0.5
+    """
+    help = 'ログインの、1秒あたりの試行数と応答時間のパーセンタイル、成功・失敗・制限の件数を計測します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teacher', type=int, required=True, help='ログインする教師番号')
+        parser.add_argument('--password', required=True, help='教師の正しいパスワード')
+        parser.add_argument('--requests', type=int, default=200, help='ログインの試行の総数')
+        parser.add_argument('--concurrency', type=int, default=8, help='同時に試行する数')
+        parser.add_argument('--wrong', type=float, default=0.0, help='間違ったパスワードで試行する割合（0〜1）')
+        parser.add_argument('--ips', type=int, default=1, help='送信元のIPアドレスの数')
+        parser.add_argument('--no-throttle', action='store_true', help='ログインの制限を無効にして計測する')
+
+    def handle(self, *args, **options):
+        if not Teacher.objects.filter(teacher_id=options['teacher']).exists():
+            raise CommandError(f'教師番号「{options["teacher"]}」は存在しません。')
+
+        # テスト用のクライアントのホスト名（testserver）を許可する
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if options['no_throttle']:
+            overrides.update(LOGIN_THROTTLE_IP_BURST=10 ** 9, LOGIN_THROTTLE_TEACHER_BURST=10 ** 9)
+
+        url = reverse('accounts:login')
+        wrong_every = round(1 / options['wrong']) if options['wrong'] > 0 else 0
+        remaining = iter(range(options['requests']))
+        lock = threading.Lock()
+        elapsed = []
+        outcomes = Counter()
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        number = next(remaining, None)
+                    if number is None:
+                        return
+                    wrong = wrong_every and number % wrong_every == 0
+                    data = {
+                        'teacher_id': options['teacher'],
+                        'password': 'x' + options['password'] if wrong else options['password'],
+                    }
+                    started = time.perf_counter()
+                    response = client.post(url, data, REMOTE_ADDR=f'10.0.0.{number % options["ips"] + 1}')
+                    ms = (time.perf_counter() - started) * 1000
+                    client.logout()
+                    with lock:
+                        elapsed.append(ms)
+                        outcomes[{302: '成功', 200: '失敗', 429: '制限'}.get(response.status_code, 'その他')] += 1
+            finally:
+                connections.close_all()
+
+        with override_settings(**overrides):
+            started = time.perf_counter()
+            threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            total = time.perf_counter() - started
+
+        elapsed.sort()
+        self.stdout.write(
+            f'反復回数 {settings.PASSWORD_HASH_ITERATIONS}: {len(elapsed)}件 {total:.2f}秒: '
+            f'{len(elapsed) / total:.1f} req/s, p50 {statistics.median(elapsed):.1f}ms, '
+            f'p95 {percentile(elapsed, 95):.1f}ms, p99 {percentile(elapsed, 99):.1f}ms'
+        )
+        self.stdout.write('  ' + ', '.join(f'{name} {count}件' for name, count in outcomes.most_common()))
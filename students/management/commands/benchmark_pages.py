@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from accounts.models import Teacher
+from students.models import Score, Student
+
+
+class Command(BaseCommand):
+    """
+    主な画面の描画時間を計測するコマンド。
+
+    ミドルウェアを通さずにビューを直接呼び出し、一覧・検索画面ごとに
+    描画時間（中央値・最小）とクエリ数を表示します。
+    検索条件には、データベース上の最初の学生の入学年度・クラスと、最初の点数の科目を使います。
+    テンプレートの変更やキャッシュの設定の前後で、同じデータベースに対して実行して比較します。
+
+    使用例:
+        python manage.py benchmark_pages --repeat 100
+    """
+    help = '主な画面の描画時間を計測します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='画面ごとの計測回数')
+        parser.add_argument('--teacher', type=int, help='ログインする教師番号（省略時は最初の教師）')
+
+    def pages(self):
+        """(画面名, メソッド, URL名, 送信データ) のリスト"""
+        student = Student.objects.order_by('student_id').first()
+        score = Score.objects.order_by('id').first()
+        if student is None or score is None:
+            raise CommandError('学生・点数のデータがありません。')
+        search = {'year': student.ent_year, 'class': student.class_id_id}
+        return [
+            ('stu_list', 'get', 'students:stu_list', {}),
+            ('cls_list', 'get', 'class:cls_list', {}),
+            ('sub_list', 'get', 'scores:sub_list', {}),
+            ('score_list', 'get', 'scores:score_list', {}),
+            ('score_list_post', 'post', 'scores:score_list', dict(search, subject=score.subject_id_id)),
+            ('at_search', 'get', 'attendance:at_search', {}),
+            ('at_search_post', 'post', 'attendance:at_search', dict(search, day='2024-12-05')),
+        ]
+
+    def handle(self, *args, **options):
+        teachers = Teacher.objects.order_by('teacher_id')
+        if options['teacher'] is not None:
+            teachers = teachers.filter(teacher_id=options['teacher'])
+        teacher = teachers.first()
+        if teacher is None:
+            raise CommandError('教師が登録されていません。')
+
+        factory = RequestFactory()
+        self.stdout.write(f"{'画面':<16} {'中央値(ms)':>10} {'最小(ms)':>10} {'クエリ数':>8}")
+        for name, method, url_name, data in self.pages():
+            url = reverse(url_name)
+            view = resolve(url).func
+            elapsed = []
+            for _ in range(options['repeat']):
+                request = getattr(factory, method)(url, data)
+                request.user = teacher
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    view(request)
+                    elapsed.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name:<16} {statistics.median(elapsed):>10.2f} {min(elapsed):>10.2f} {len(queries):>8}'
+            )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.imports import IMPORT_ENCODINGS, IMPORTERS, read_csv
+
+
+class Command(BaseCommand):
+    """
+    CSVファイルから学生・点数・出欠席をまとめて登録するコマンド。
+
+    学生一覧の「CSV一括登録」画面と同じ検証・登録処理を使います。
+    エラーのあった行は、行番号とエラー内容を表示します。
+
+    使用例:
+        python manage.py import_csv students students.csv --encoding cp932
+    """
+    help = 'CSVファイルから学生・点数・出欠席をまとめて登録します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('import_type', choices=sorted(IMPORTERS), help='登録内容')
+        parser.add_argument('path', help='CSVファイルのパス')
+        parser.add_argument('--encoding', default='utf-8', choices=sorted(IMPORT_ENCODINGS), help='文字コード')
+        parser.add_argument('--dry-run', action='store_true', help='検証のみ行い、登録しない')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                result = IMPORTERS[options['import_type']](
+                    read_csv(file, options['encoding']), dry_run=options['dry_run']
+                )
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'CSVファイルを読み込めませんでした: {e}')
+
+        for line, errors in result.errors:
+            self.stderr.write(f'{line}行目: ' + ' / '.join(errors))
+        label = '登録可能' if options['dry_run'] else '登録'
+        self.stdout.write(
+            f'{label}: {result.created}件, エラー: {len(result.errors)}件 ({time.perf_counter() - started:.2f}秒)'
+        )
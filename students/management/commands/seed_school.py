@@ -0,0 +1,254 @@
+import datetime
+import io
+import random
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from accounts.models import Teacher
+from attendance.models import Attendance, AttendanceMonthly, rebuild_monthly_attendance, recompute_absence_days
+from students.models import Course, Score, Student, Subject, sync_student_id_sequence
+from scores.stats import invalidate_all_score_statistics
+from students.reference import invalidate
+
+LAST_NAMES = ['佐藤', '鈴木', '高橋', '田中', '伊藤', '渡辺', '山本', '中村', '小林', '加藤', '吉田', '山田', '長野', '松本', '井上']
+FIRST_NAMES = ['太郎', '花子', '翔太', '陽菜', '大翔', '結衣', '蓮', '美咲', '悠真', '葵', '湊', '凛', '健太', 'さくら', '拓海']
+SUBJECT_NAMES = ['国語', '数学', '英語', '理科', '社会', '情報', '体育', '音楽', '美術', '技術', '家庭', '保健']
+
+# 生成した教師の教師番号はこの値から採番する（既存の教師と衝突させないため）
+TEACHER_ID_START = 900000
+
+# --flush で削除するテーブル（生成した教師は TEACHER_ID_START 以降の教師番号のみ削除する）
+SEED_MODELS = [AttendanceMonthly, Attendance, Score, Student, Course, Subject]
+
+
+class Command(BaseCommand):
+    """
+    負荷試験用の大量データを生成するコマンド。
+
+    クラス・教師・科目・学生・点数・出欠データを、シード値から決定的に生成します。
+    COPY でバッチ単位に書き込むため、数百万件の出欠データでもメモリ使用量は一定です。
+    COPY・TRUNCATE や月別集計・欠席累計の再計算など PostgreSQL の機能を使うため、PostgreSQL 専用です。
+
+    使用例:
+        python manage.py seed_school --classes 300 --students 30000 --years 3 --flush
+    """
+    help = '負荷試験用のクラス・学生・点数・出欠データを生成します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='乱数シード（同じ値なら同じデータを生成）')
+        parser.add_argument('--classes', type=int, default=200, help='クラス数（最大999）')
+        parser.add_argument('--students', type=int, default=20000, help='学生数')
+        parser.add_argument('--subjects', type=int, default=10, help='科目数')
+        parser.add_argument('--years', type=int, default=3, help='出欠データを生成する年数')
+        parser.add_argument('--attendance-rate', type=float, default=0.05,
+                            help='1日あたりに出欠記録（欠席・遅刻・早退・その他）がある学生の割合')
+        parser.add_argument('--end-date', default=None, help='出欠データの最終日（YYYY-MM-DD、既定は今日）')
+        parser.add_argument('--batch-size', type=int, default=50000, help='1回の書き込みで送る行数')
+        parser.add_argument('--flush', action='store_true', help='生成前に既存の学生・クラス・科目・点数・出欠データを削除する')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(f'このコマンドは PostgreSQL でのみ実行できます（現在のデータベース: {connection.vendor}）。')
+        if not 1 <= options['classes'] <= 999:
+            raise CommandError('--classes は1～999の範囲で指定してください。')
+        if not 1 <= options['students'] <= 9999999999:
+            raise CommandError('--students は1以上を指定してください。')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        end_date = (
+            datetime.date.fromisoformat(options['end_date']) if options['end_date'] else datetime.date.today()
+        )
+
+        with transaction.atomic():
+            if options['flush']:
+                self.step('削除', self.flush)
+            elif self.has_existing_data():
+                # 生成するデータの番号（教師番号・クラス番号・学番など）は固定のため、既存のデータと衝突する
+                raise CommandError(
+                    '学生・クラス・科目・点数・出欠データまたは生成済みの教師が既に存在します。'
+                    '既存のデータを削除して生成する場合は --flush を指定してください。'
+                )
+            courses = self.step('クラス', self.create_courses, options['classes'])
+            subjects = self.step('科目', self.create_subjects, options['subjects'])
+            students = self.step('学生', self.create_students, options['students'], courses, end_date.year)
+            self.step('点数', self.create_scores, students, subjects)
+            self.step('出欠', self.create_attendance, students, options['years'], options['attendance_rate'], end_date)
+            self.step('月別集計', rebuild_monthly_attendance)
+            self.step('欠席累計', recompute_absence_days)
+            # TRUNCATE・COPY ではシグナルが送られないため、キャッシュは明示的に無効にする
+            for model in (Teacher, Course, Subject, Student, Score, Attendance):
+                invalidate(model)
+            invalidate_all_score_statistics()
+
+    def step(self, label, func, *args):
+        """1つの生成処理を実行し、件数と所要時間を表示する"""
+        started = time.perf_counter()
+        result = func(*args)
+        count = result if isinstance(result, int) else len(result)
+        self.stdout.write(f'{label}: {count}件 ({time.perf_counter() - started:.2f}秒)')
+        return result
+
+    def has_existing_data(self):
+        """--flush で削除するデータが1件でもあるか"""
+        return (
+            any(model.objects.exists() for model in SEED_MODELS)
+            or Teacher.objects.filter(teacher_id__gte=TEACHER_ID_START).exists()
+        )
+
+    def flush(self):
+        # 大量データの削除はTRUNCATEで行う（参照しているテーブルもまとめて空にする）
+        with connection.cursor() as cursor:
+            cursor.execute('TRUNCATE {} CASCADE'.format(
+                ', '.join(connection.ops.quote_name(model._meta.db_table) for model in SEED_MODELS)
+            ))
+        return Teacher.objects.filter(teacher_id__gte=TEACHER_ID_START).delete()[0]
+
+    def create_courses(self, count):
+        teachers = [
+            Teacher(teacher_id=TEACHER_ID_START + i, teacher_name=self.rng.choice(LAST_NAMES), password='!')
+            for i in range(count)
+        ]
+        Teacher.objects.bulk_create(teachers, batch_size=self.batch_size)
+        courses = [
+            Course(class_id=str(i + 1).zfill(3), course_name=f'コース{i + 1}', teacher_id=teacher)
+            for i, teacher in enumerate(teachers)
+        ]
+        Course.objects.bulk_create(courses, batch_size=self.batch_size)
+        return [course.class_id for course in courses]
+
+    def create_subjects(self, count):
+        subjects = [
+            Subject(subject_id=f'S{i + 1:03d}', subject_name=f'{SUBJECT_NAMES[i % len(SUBJECT_NAMES)]}{i // len(SUBJECT_NAMES) + 1}')
+            for i in range(count)
+        ]
+        Subject.objects.bulk_create(subjects, batch_size=self.batch_size)
+        return [subject.subject_id for subject in subjects]
+
+    def create_students(self, count, courses, this_year):
+        rng = self.rng
+        rows = (
+            (
+                str(i + 1).zfill(10),
+                rng.choice(LAST_NAMES),
+                rng.choice(FIRST_NAMES),
+                f'{rng.randrange(10000000):07d}',
+                f'長野県長野市栗田{rng.randrange(1, 1000)}',
+                None,
+                f'0{rng.choice("789")}0{rng.randrange(100000000):08d}',
+                this_year - rng.randrange(4),
+                rng.choice(courses),
+                '0.0',
+                True,
+            )
+            for i in range(count)
+        )
+        self.write_rows(Student, [
+            'student_id', 'last_name', 'first_name', 'postalcode', 'address1', 'address2', 'phone_number',
+            'ent_year', 'class_id', 'absence_day', 'attend_flag',
+        ], rows)
+        sync_student_id_sequence()
+        return [str(i + 1).zfill(10) for i in range(count)]
+
+    def create_scores(self, students, subjects):
+        rng = self.rng
+        rows = (
+            (student_id, subject_id, min(100, max(0, int(rng.gauss(65, 15)))))
+            for student_id in students
+            for subject_id in subjects
+        )
+        with self.indexes_rebuilt_after(Score):
+            return self.write_rows(Score, ['student_id', 'subject_id', 'score'], rows)
+
+    def create_attendance(self, students, years, rate, end_date):
+        rng = self.rng
+        start_date = end_date - datetime.timedelta(days=365 * years)
+        per_day = int(len(students) * rate)
+        # 平日のみを登校日とし、1日ごとに対象の学生を抽出する
+        school_days = [
+            start_date + datetime.timedelta(days=offset)
+            for offset in range((end_date - start_date).days + 1)
+            if (start_date + datetime.timedelta(days=offset)).weekday() < 5
+        ]
+        rows = (
+            row
+            for day in school_days
+            for row in zip(
+                rng.sample(students, per_day),
+                [day.isoformat()] * per_day,
+                rng.choices((1, 2, 3, 4), weights=(5, 3, 2, 1), k=per_day),
+            )
+        )
+        with self.indexes_rebuilt_after(Attendance):
+            return self.write_rows(Attendance, ['student_id', 'attendance_date', 'attendance_id'], rows)
+
+    @contextmanager
+    def indexes_rebuilt_after(self, model):
+        """
+        書き込みの間だけ外部キー・一意制約とインデックスを外し、書き込み後に作り直す。
+
+        1行ごとのインデックス更新と外部キー検査をなくし、まとめて1回で構築・検証するため。
+        """
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype IN ('f', 'u')",
+                [table],
+            )
+            constraints = cursor.fetchall()
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s "
+                "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+                [table, table],
+            )
+            indexes = cursor.fetchall()
+            quoted_table = connection.ops.quote_name(table)
+            # 保留中の外部キー検査があるとALTER TABLEできないため、先に検査を済ませる
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+            for name, _ in constraints:
+                cursor.execute(f'ALTER TABLE {quoted_table} DROP CONSTRAINT {connection.ops.quote_name(name)}')
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+        yield
+        with connection.cursor() as cursor:
+            for _, definition in indexes:
+                cursor.execute(definition)
+            for name, definition in constraints:
+                cursor.execute(f'ALTER TABLE {quoted_table} ADD CONSTRAINT {connection.ops.quote_name(name)} {definition}')
+
+    def write_rows(self, model, fields, rows):
+        """
+        行データをバッチ単位でCOPYでデータベースに書き込み、書き込んだ件数を返す。
+        """
+        columns = [model._meta.get_field(field).column for field in fields]
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                total += self.write_batch(model, columns, batch)
+                batch = []
+        if batch:
+            total += self.write_batch(model, columns, batch)
+        return total
+
+    def write_batch(self, model, columns, batch):
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write('\t'.join(r'\N' if value is None else str(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                'COPY {} ({}) FROM STDIN'.format(
+                    connection.ops.quote_name(model._meta.db_table),
+                    ', '.join(connection.ops.quote_name(column) for column in columns),
+                ),
+                buffer,
+            )
+        return len(batch)
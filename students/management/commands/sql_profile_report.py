@@ -0,0 +1,77 @@
+import json
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, p):
+    """昇順に並んだ `values` の p パーセンタイル（最近順位法）"""
+    return values[max(math.ceil(len(values) * p / 100) - 1, 0)]
+
+
+class Command(BaseCommand):
+    """
+    SQLプロファイルのログ（`SQLProfilingMiddleware` の出力）を集計するコマンド。
+
+    全体とビューごとの応答時間の p50/p95/p99、SQLの平均件数・時間、テンプレートの平均描画時間を、
+    p95 の遅い順に表示します。続けて、特に遅かったクエリを表示します。
+
+    使用例:
+        python manage.py sql_profile_report /var/log/studentapp/sql_profile.log --top 10
+    """
+    help = 'SQLプロファイルのログから、遅い画面と応答時間のパーセンタイルを集計します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='ログファイルのパス（DJANGO_SQL_PROFILE_LOG）')
+        parser.add_argument('--top', type=int, default=10, help='表示するビュー・クエリの件数')
+
+    def read(self, path):
+        records = []
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        self.stderr.write(f'{line_number}行目: JSONとして読み込めないため読み飛ばしました。')
+        except OSError as e:
+            raise CommandError(f'ログファイルを読み込めませんでした: {e}')
+        return records
+
+    def handle(self, *args, **options):
+        records = self.read(options['path'])
+        if not records:
+            raise CommandError('集計するリクエストがありません。')
+
+        endpoints = {}
+        for record in records:
+            endpoints.setdefault(record.get('view') or record['path'], []).append(record)
+
+        header = f"{'ビュー':<28} {'件数':>6} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9} " \
+                 f"{'SQL件数':>8} {'SQL(ms)':>9} {'描画(ms)':>9}"
+        self.stdout.write(header)
+        rows = [('(全体)', records)] + sorted(
+            endpoints.items(),
+            key=lambda item: -percentile(sorted(r['duration_ms'] for r in item[1]), 95),
+        )[:options['top']]
+        for name, group in rows:
+            durations = sorted(r['duration_ms'] for r in group)
+            self.stdout.write(
+                f'{name:<28} {len(group):>6} {percentile(durations, 50):>9.1f} '
+                f'{percentile(durations, 95):>9.1f} {percentile(durations, 99):>9.1f} '
+                f"{sum(r['sql_count'] for r in group) / len(group):>8.1f} "
+                f"{sum(r['sql_ms'] for r in group) / len(group):>9.1f} "
+                f"{sum(r['template_ms'] for r in group) / len(group):>9.1f}"
+            )
+
+        slowest = sorted(
+            ((query['ms'], record.get('view') or record['path'], query['sql'])
+             for record in records for query in record.get('slowest_queries', [])),
+            key=lambda query: -query[0],
+        )[:options['top']]
+        if slowest:
+            self.stdout.write('\n遅いクエリ:')
+            for ms, view, sql in slowest:
+                self.stdout.write(f'  {ms:>9.1f}ms  {view}  {sql}')
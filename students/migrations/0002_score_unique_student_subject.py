@@ -0,0 +1,32 @@
+# Generated by Django 4.2.17 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+
+def remove_duplicate_scores(apps, schema_editor):
+    """一意制約を追加する前に、学生・科目が重複する点数を最新の1件だけ残して削除する"""
+    Score = apps.get_model('students', 'Score')
+    duplicates = (
+        Score.objects.values('student_id', 'subject_id')
+        .annotate(max_id=models.Max('id'), count=models.Count('id'))
+        .filter(count__gt=1)
+    )
+    for row in duplicates:
+        Score.objects.filter(
+            student_id=row['student_id'], subject_id=row['subject_id'], id__lt=row['max_id']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_scores, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='score',
+            constraint=models.UniqueConstraint(fields=('student_id', 'subject_id'), name='unique_score_student_subject'),
+        ),
+    ]
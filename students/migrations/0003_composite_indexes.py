@@ -0,0 +1,21 @@
+# Generated by Django 4.2.17 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_score_unique_student_subject'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['subject_id', 'student_id'], name='score_subject_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['ent_year', 'class_id', 'student_id'], name='student_year_class_id_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    学生番号の採番用シーケンスを作成する。
+
+    既存の学生番号の最大値の次から採番を始める。
+    """
+
+    dependencies = [
+        ('students', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE SEQUENCE student_id_seq MINVALUE 1 MAXVALUE 9999999999 OWNED BY students_student.student_id",
+                "SELECT setval('student_id_seq', COALESCE((SELECT MAX(student_id::bigint) FROM students_student "
+                "WHERE student_id ~ '^[0-9]+$'), 0) + 1, false)",
+            ],
+            reverse_sql="DROP SEQUENCE student_id_seq",
+        ),
+    ]
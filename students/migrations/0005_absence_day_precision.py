@@ -0,0 +1,19 @@
+# Generated by Django 4.2.17 on 2026-10-18 13:57
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_student_id_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='absence_day',
+            field=models.DecimalField(decimal_places=1, default=Decimal('0.0'), max_digits=5, verbose_name='欠席累計'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connection, models
 from django.core.validators import MinLengthValidator
 from django.core.validators import RegexValidator
 from decimal import Decimal
@@ -41,16 +41,51 @@ class Student(models.Model):
 
     ent_year = models.IntegerField(verbose_name='入学年度', blank=True, null=True)
     class_id = models.ForeignKey(Course, verbose_name='クラス番号', on_delete=models.PROTECT)
-    absence_day = models.DecimalField(verbose_name='欠席累計', default=Decimal('0.0'), max_digits=3, decimal_places=1)
+    # 在籍中の累計のため、100日以上になっても保存できる桁数にする
+    absence_day = models.DecimalField(verbose_name='欠席累計', default=Decimal('0.0'), max_digits=5, decimal_places=1)
     attend_flag = models.BooleanField(verbose_name='在籍フラグ', default=True, blank=True, null=True)
 
     class Meta:
         verbose_name_plural = 'Student'
+        indexes = [
+            # 検索画面の「入学年度・クラスで絞り込み、学生番号順」に対応
+            models.Index(fields=['ent_year', 'class_id', 'student_id'], name='student_year_class_id_idx'),
+        ]
     
     def __str__(self):
         return self.student_id + ',' + self.last_name + self.first_name
     
 
+def allocate_student_ids(count=1):
+    """
+    学生番号を払い出す。
+
+    データベースのシーケンス（student_id_seq）から採番し、10桁のゼロ埋め文字列で返すため、
+    同時に登録しても学生番号が重複しません。一括登録の場合は `count` 件をまとめて1クエリで払い出します。
+
+    引数:
+        count (int): 払い出す件数
+    戻り値:
+        list: 学生番号のリスト（例: ['0000000001', '0000000002']）
+    """
+    if count <= 0:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval('student_id_seq') FROM generate_series(1, %s)", [count])
+        return [str(value).zfill(10) for value, in cursor.fetchall()]
+
+
+def sync_student_id_sequence():
+    """学生番号を直接指定して登録した後に、採番用シーケンスを既存の最大値の次まで進める"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT setval('student_id_seq', latest) FROM ("
+            "SELECT MAX(student_id::bigint) AS latest FROM students_student WHERE student_id ~ '^[0-9]+$'"
+            ") AS students "
+            "WHERE latest >= (SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END FROM student_id_seq)"
+        )
+
+
 class Score(models.Model):
     """成績モデル
         学生の成績情報を管理するテーブル
@@ -61,6 +96,14 @@ class Score(models.Model):
 
     class Meta:
         verbose_name_plural = 'Score'
+        indexes = [
+            # 成績一覧の「科目で絞り込み、学生ごとに参照」に対応
+            models.Index(fields=['subject_id', 'student_id'], name='score_subject_student_idx'),
+        ]
+        constraints = [
+            # 学生・科目ごとに点数は1件（一括登録・更新の競合キー）
+            models.UniqueConstraint(fields=['student_id', 'subject_id'], name='unique_score_student_subject'),
+        ]
     
     def __str__(self):
-        return f'{self.student_id.student_id} - {self.subject_id.subject_id}'
\ No newline at end of file
+        return f'{self.student_id_id} - {self.subject_id_id}'
\ No newline at end of file
@@ -0,0 +1,46 @@
+import datetime
+
+from django.http import HttpResponseBadRequest
+
+
+class BadParameter(Exception):
+    """GETパラメータの形式の誤り（400 Bad Request として返す）"""
+
+    def response(self):
+        return HttpResponseBadRequest(str(self), content_type='text/plain; charset=utf-8')
+
+
+def int_param(params, name):
+    """
+    整数のGETパラメータを取得する。
+
+    戻り値:
+        int: 指定された値。指定がない場合は ''（絞り込みなし）。
+    例外:
+        BadParameter: 整数でない場合
+    """
+    value = params.get(name, '')
+    if not value:
+        return ''
+    try:
+        return int(value)
+    except ValueError:
+        raise BadParameter(f'{name} は整数で指定してください。')
+
+
+def date_param(params, name):
+    """
+    日付（YYYY-MM-DD）のGETパラメータを取得する。
+
+    戻り値:
+        datetime.date: 指定された日付。指定がない場合は None。
+    例外:
+        BadParameter: 日付として正しくない場合
+    """
+    value = params.get(name, '')
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise BadParameter(f'{name} は YYYY-MM-DD 形式の日付で指定してください。')
@@ -0,0 +1,136 @@
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import Teacher
+from scores.models import Subject
+from studentapp.metrics import record_cache
+from .models import Course
+
+# 参照データ（クラス・科目・教師）のキャッシュ有効期間（秒）
+# 更新時はバージョンが変わるため、期限切れを待たずに新しいデータが使われる
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# モデルごとのバージョン・最終更新日時を保持するキャッシュキー
+VERSION_KEY = 'reference:version:{}'
+MODIFIED_KEY = 'reference:modified:{}'
+
+# 参照データの名前と、データの元になるモデル（テンプレートの断片キャッシュのキーにも使う）
+REFERENCE_MODELS = {
+    'courses': (Course, Teacher),
+    'subjects': (Subject,),
+    'teacher_names': (Teacher,),
+}
+
+
+def model_label(model):
+    """`model` はモデル、またはモデル以外のデータの名前"""
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def version_key(model):
+    """バージョンのキャッシュキー"""
+    return VERSION_KEY.format(model_label(model))
+
+
+def get_version(model):
+    """モデルのデータのバージョンを返す（未設定の場合は現在時刻で初期化する）"""
+    key = version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # キャッシュから消えた後に古い番号へ戻らないよう、初期値は現在時刻にする
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_last_modified(model):
+    """モデルのデータの最終更新日時（UNIX時間）を返す（未設定の場合は現在時刻で初期化する）"""
+    key = MODIFIED_KEY.format(model_label(model))
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, time.time(), timeout=None)
+        modified = cache.get(key)
+    return modified
+
+
+def bump_version(model):
+    """モデルのデータのバージョンを進め、そのモデルを使うキャッシュを無効にする"""
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    cache.set(MODIFIED_KEY.format(model_label(model)), time.time(), timeout=None)
+
+
+def reference_version(*models):
+    """`models` のバージョンをつないだ文字列（どれかのモデルが更新されると変わる）"""
+    return ':'.join(str(get_version(model)) for model in models)
+
+
+def invalidate(model):
+    """
+    モデルの更新後に呼び出し、そのモデルのデータを使うキャッシュを無効にする。
+
+    トランザクション内で更新した場合は、コミット前に他のリクエストが古いデータを
+    新しいバージョンでキャッシュすることがあるため、コミット後にもう一度バージョンを進める。
+    """
+    bump_version(model)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_version(model))
+
+
+def cached(name, models, load):
+    """
+    参照データをキャッシュから取得する。
+
+    キャッシュキーに `models` のバージョンを含めるため、どれかのモデルが更新されると
+    別のキーになり、次の呼び出しでデータベースから読み直します。
+
+    引数:
+        name (str): 参照データの名前
+        models (tuple): データの元になるモデル
+        load (callable): キャッシュにない場合にデータを作成する関数
+    """
+    key = 'reference:{}:{}'.format(name, reference_version(*models))
+    data = cache.get(key)
+    record_cache(name, data is not None)
+    if data is None:
+        data = load()
+        cache.set(key, data, timeout=REFERENCE_CACHE_TIMEOUT)
+    return data
+
+
+def get_courses():
+    """全てのクラス（class_id順、担任の教師を含む）"""
+    return cached(
+        'courses', REFERENCE_MODELS['courses'],
+        lambda: list(Course.objects.select_related('teacher_id').order_by('class_id')),
+    )
+
+
+def get_subjects():
+    """全ての科目（subject_id順）"""
+    return cached('subjects', REFERENCE_MODELS['subjects'], lambda: list(Subject.objects.order_by('subject_id')))
+
+
+def get_subject_names():
+    """科目番号をキー、科目名を値とした辞書"""
+    return {subject.subject_id: subject.subject_name for subject in get_subjects()}
+
+
+def get_teacher_names():
+    """教師番号をキー、教師名を値とした辞書"""
+    return cached(
+        'teacher_names', REFERENCE_MODELS['teacher_names'],
+        lambda: dict(Teacher.objects.values_list('teacher_id', 'teacher_name')),
+    )
+
+
+def ent_year_choices():
+    """入学年度の選択肢（今年の10年前から10年後まで）"""
+    today_year = datetime.date.today().year
+    return list(range(today_year - 10, today_year + 11))
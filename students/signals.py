@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import Teacher
+from scores.models import Subject
+from scores.stats import invalidate_all_score_statistics
+from .models import Course, Score, Student
+from .reference import invalidate
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Teacher)
+def reference_data_changed(sender, update_fields=None, **kwargs):
+    """クラス・科目・教師が登録・更新・削除されたら、参照データのキャッシュを無効にする"""
+    # ログインのたびに行われる最終ログイン日時の更新は、参照データに影響しない
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate(sender)
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Score)
+def data_changed(sender, **kwargs):
+    """学生・点数が1件ずつ登録・更新・削除されたら、そのデータを使うキャッシュを無効にする"""
+    invalidate(sender)
+    # 管理画面などでの変更は、どの入学年度・クラス・科目の統計に影響するか分からないため全て無効にする
+    invalidate_all_score_statistics()
@@ -0,0 +1,20 @@
+from django import template
+
+from students.reference import REFERENCE_MODELS, reference_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def reference_data_version(name):
+    """
+    参照データ（'courses', 'subjects' など）のバージョンを返すテンプレートタグ。
+
+    `{% cache %}` のキーに含めると、クラス・科目・教師が更新されたときに別のキーになり、
+    古い選択肢を表示しなくなります。
+
+    使用例:
+        {% reference_data_version 'courses' as courses_version %}
+        {% cache 86400 class_select courses_version select_class %}...{% endcache %}
+    """
+    return reference_version(*REFERENCE_MODELS[name])
@@ -1,3 +1,353 @@
-from django.test import TestCase
+import io
+import tempfile
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Teacher
+from .imports import import_attendance, import_scores, import_students, read_csv
+from .models import Course, Score, Student, Subject, allocate_student_ids, sync_student_id_sequence
+from .reference import get_courses, get_subject_names, get_subjects, get_teacher_names, version_key
+from .views import STUDENT_LIST_PAGE_SIZE
 
 # Create your tests here.
+class StudentListViewTests(TestCase):
+    """学生一覧ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        cls.course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        cls.other_course = Course.objects.create(class_id='102', course_name='情報コース')
+        Student.objects.bulk_create([
+            Student(
+                student_id=str(i).zfill(10), last_name='長野', first_name='太郎',
+                ent_year=2023 + i % 2, class_id=cls.course if i % 3 else cls.other_course,
+            )
+            for i in range(1, 301)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def student_ids(self, response):
+        return [student.student_id for student in response.context['students']]
+
+    def test_pages_walk_forward_and_back(self):
+        first = self.client.get(reverse('students:stu_list'))
+        self.assertEqual(self.student_ids(first), [str(i).zfill(10) for i in range(1, STUDENT_LIST_PAGE_SIZE + 1)])
+        self.assertEqual(first.context['prev_before'], '')
+
+        second = self.client.get(reverse('students:stu_list'), {'after': first.context['next_after']})
+        self.assertEqual(self.student_ids(second)[0], str(STUDENT_LIST_PAGE_SIZE + 1).zfill(10))
+
+        back = self.client.get(reverse('students:stu_list'), {'before': second.context['prev_before']})
+        self.assertEqual(self.student_ids(back), self.student_ids(first))
+
+    def test_filters_by_year_and_class(self):
+        response = self.client.get(reverse('students:stu_list'), {'year': '2024', 'class': '102'})
+
+        students = response.context['students']
+        self.assertTrue(students)
+        self.assertTrue(all(student.ent_year == 2024 and student.class_id_id == '102' for student in students))
+
+    def test_bad_year_is_rejected(self):
+        response = self.client.get(reverse('students:stu_list'), {'year': 'abc'})
+        self.assertContains(response, 'year は整数で指定してください。', status_code=400)
+
+    def test_last_page_costs_the_same_as_first(self):
+        with CaptureQueriesContext(connection) as first_queries:
+            self.client.get(reverse('students:stu_list'))
+        with CaptureQueriesContext(connection) as last_queries:
+            response = self.client.get(reverse('students:stu_list'), {'after': '0000000290'})
+
+        self.assertEqual(len(response.context['students']), 10)
+        self.assertEqual(response.context['next_after'], '')
+        self.assertEqual(len(first_queries), len(last_queries))
+
+
+class StudentExportViewTests(TestCase):
+    """学生一覧CSV出力ビューのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        course = Course.objects.create(class_id='101', course_name='システム開発コース')
+        Student.objects.create(student_id='0000000001', last_name='長野', first_name='太郎', ent_year=2024, class_id=course)
+        Student.objects.create(student_id='0000000002', last_name='松本', first_name='花子', ent_year=2023, class_id=course)
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_streams_utf8_csv_with_bom(self):
+        response = self.client.get(reverse('students:stu_export'), {'year': '2024'})
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'\xef\xbb\xbf'))
+        lines = content.decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[1], '0000000001,長野,太郎,2024,101,システム開発コース,0.0')
+        self.assertEqual(len(lines), 2)
+
+    def test_streams_cp932_for_excel(self):
+        response = self.client.get(reverse('students:stu_export'), {'encoding': 'cp932'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=Shift_JIS')
+        content = b''.join(response.streaming_content)
+        self.assertIn('松本'.encode('cp932'), content)
+
+
+class StudentImportTests(TestCase):
+    """CSV一括登録のテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass')
+        Course.objects.create(class_id='101', course_name='システム開発コース')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def student_csv(self, count, encoding='utf-8-sig'):
+        lines = ['氏名,名前,入学年度,クラス番号,郵便番号,住所1,住所2(アパート名など),電話番号']
+        lines += [f'長野,太郎{i},2024,101,3800921,長野県長野市栗田123,,09012345678' for i in range(count)]
+        return io.BytesIO('\n'.join(lines).encode(encoding))
+
+    def test_valid_rows_are_imported_and_errors_reported(self):
+        csv_file = io.BytesIO(
+            'last_name,first_name,ent_year,class_id,postalcode,address1,phone_number\n'
+            '長野,太郎,2024,101,3800921,長野県長野市栗田123,09012345678\n'
+            '松本,花子,2024,999,38009,長野県松本市,09012345678\n'.encode('utf-8')
+        )
+        csv_file.name = 'students.csv'
+        response = self.client.post(reverse('students:stu_import'), {'import_type': 'students', 'csv_file': csv_file})
+
+        result = response.context['result']
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, errors in result.errors], [3])
+        self.assertTrue(any(error.startswith('postalcode:') for error in result.errors[0][1]))
+        self.assertTrue(any(error.startswith('class_id:') for error in result.errors[0][1]))
+        self.assertRegex(Student.objects.get().student_id, r'^\d{10}$')
+
+    def test_dry_run_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = import_students(read_csv(self.student_csv(3)), dry_run=True)
+
+        self.assertEqual(result.created, 3)
+        self.assertFalse(Student.objects.exists())
+        # 学生番号のシーケンスを進めない（nextval はロールバックされず欠番になるため）
+        self.assertFalse(any('nextval' in query['sql'] for query in queries))
+
+    def test_unknown_encoding_is_rejected(self):
+        response = self.client.post(reverse('students:stu_import'), {
+            'import_type': 'students', 'csv_file': self.student_csv(1), 'encoding': 'latin-2',
+        })
+
+        self.assertIsNone(response.context['result'])
+        self.assertContains(response, '文字コードは UTF-8 または Shift_JIS を指定してください。')
+        self.assertFalse(Student.objects.exists())
+
+    def test_cp932_and_query_count_does_not_grow_per_row(self):
+        get_courses()  # 参照データのキャッシュを温めておく
+        with CaptureQueriesContext(connection) as small:
+            import_students(read_csv(self.student_csv(10, 'cp932'), 'cp932'))
+        with CaptureQueriesContext(connection) as large:
+            import_students(read_csv(self.student_csv(900, 'cp932'), 'cp932'))
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Student.objects.count(), 910)
+
+    def test_scores_and_attendance_import(self):
+        import_students(read_csv(self.student_csv(1)))
+        student_id = Student.objects.get().student_id
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+
+        scores = import_scores(read_csv(io.BytesIO(
+            f'学生番号,科目番号,点数\n{student_id},A01,80\n{student_id},A02,70\n{student_id},A01,101\n'.encode('utf-8')
+        )))
+        attendance = import_attendance(read_csv(io.BytesIO(
+            'student_id,attendance_date,attendance_id\n'
+            f'{student_id},2024-04-10,1\n{student_id},2024-04-11,2\n{student_id},2024/04/12,1\n'.encode('utf-8')
+        )))
+
+        self.assertEqual((scores.created, len(scores.errors)), (1, 2))
+        self.assertEqual(Score.objects.get().score, 80)
+        self.assertEqual((attendance.created, len(attendance.errors)), (2, 1))
+        self.assertEqual(Student.objects.get().absence_day, Decimal('1.5'))
+
+
+class SeedSchoolTests(TestCase):
+    """負荷試験用データの生成（seed_school）のテスト"""
+
+    def seed(self, **options):
+        call_command(
+            'seed_school', classes=2, students=5, subjects=2, years=1, end_date='2024-12-06',
+            stdout=io.StringIO(), **options,
+        )
+
+    def test_existing_data_requires_flush(self):
+        self.seed()
+        self.assertEqual((Course.objects.count(), Student.objects.count(), Score.objects.count()), (2, 5, 10))
+
+        # 2回目は、既存のデータと衝突する前に --flush を求める
+        with self.assertRaisesMessage(CommandError, '--flush'):
+            self.seed()
+        self.seed(flush=True)
+        self.assertEqual((Course.objects.count(), Student.objects.count(), Score.objects.count()), (2, 5, 10))
+
+
+class StudentIdAllocatorTests(TransactionTestCase):
+    """学生番号の採番のテスト"""
+
+    def setUp(self):
+        self.course = Course.objects.create(class_id='101', course_name='システム開発コース')
+
+    def test_block_allocation_is_sequential_and_formatted(self):
+        ids = allocate_student_ids(3)
+
+        self.assertEqual(len(ids), 3)
+        self.assertTrue(all(len(student_id) == 10 and student_id.isdigit() for student_id in ids))
+        self.assertEqual([int(student_id) - int(ids[0]) for student_id in ids], [0, 1, 2])
+
+    def test_sync_skips_ids_registered_directly(self):
+        latest = int(allocate_student_ids()[0])
+        Student.objects.create(student_id=str(latest + 5).zfill(10), class_id=self.course)
+
+        sync_student_id_sequence()
+
+        self.assertEqual(allocate_student_ids(), [str(latest + 6).zfill(10)])
+
+    def test_concurrent_registrations_do_not_collide(self):
+        """複数スレッドから同時に採番・登録しても学生番号が重複しないこと"""
+        threads_count, per_thread = 8, 50
+        errors = []
+        barrier = threading.Barrier(threads_count)
+
+        def register():
+            try:
+                barrier.wait()
+                for i in range(per_thread):
+                    student_id = allocate_student_ids(1 + i % 3)[0]
+                    Student.objects.create(student_id=student_id, class_id_id='101')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=register) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Student.objects.count(), threads_count * per_thread)
+
+
+class ReferenceCacheTests(TestCase):
+    """参照データ（クラス・科目・教師）のキャッシュのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create_user(teacher_id=1, password='pass', teacher_name='長野')
+        Course.objects.create(class_id='101', course_name='システム開発コース', teacher_id=cls.teacher)
+        Subject.objects.create(subject_id='A01', subject_name='数学')
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_reference_data_is_cached(self):
+        get_courses(), get_subjects(), get_teacher_names()
+        with self.assertNumQueries(0):
+            self.assertEqual([course.teacher_id.teacher_name for course in get_courses()], ['長野'])
+            self.assertEqual(get_subject_names(), {'A01': '数学'})
+            self.assertEqual(get_teacher_names(), {1: '長野'})
+
+    def test_steady_state_does_no_queries(self):
+        self.assert_reference_data_is_cached()
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='studentapp-cache-'),
+    }})
+    def test_file_based_cache(self):
+        self.assert_reference_data_is_cached()
+        Subject.objects.create(subject_id='A02', subject_name='英語')
+        self.assertEqual(get_subject_names(), {'A01': '数学', 'A02': '英語'})
+
+    def test_save_and_delete_invalidate(self):
+        get_courses(), get_subjects(), get_teacher_names()
+
+        Subject.objects.create(subject_id='A02', subject_name='英語')
+        Subject.objects.filter(subject_id='A01').get().delete()
+        self.assertEqual(get_subject_names(), {'A02': '英語'})
+
+        self.teacher.teacher_name = '松本'
+        self.teacher.save()
+        self.assertEqual(get_teacher_names(), {1: '松本'})
+        # クラス一覧は担任の教師名も含むため、教師の更新でも読み直す
+        self.assertEqual([course.teacher_id.teacher_name for course in get_courses()], ['松本'])
+
+        Course.objects.create(class_id='102', course_name='情報処理コース')
+        self.assertEqual([course.class_id for course in get_courses()], ['101', '102'])
+
+    def test_login_does_not_invalidate(self):
+        get_teacher_names()
+        self.client.login(teacher_id=1, password='pass')
+
+        with self.assertNumQueries(0):
+            get_teacher_names()
+
+    def test_select_fragments_follow_reference_data(self):
+        """検索フォームの選択欄は断片キャッシュされ、クラス・科目の更新後は新しい選択肢を表示すること"""
+        self.client.force_login(self.teacher)
+        url = reverse('scores:score_list')
+        data = {'year': '2024', 'class': '101', 'subject': 'A01'}
+        self.client.post(url, data)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data)
+        self.assertFalse([
+            q for q in queries if 'FROM "students_course"' in q['sql'] or 'FROM "scores_subject"' in q['sql']
+        ])
+        self.assertContains(response, '<option value="101"  selected >101システム開発コース</option>', html=False)
+        self.assertContains(response, '<option value="2024"  selected >2024</option>', html=False)
+
+        # 選択中の値が違う場合は別の断片を表示する
+        response = self.client.post(url, dict(data, year='2023'))
+        self.assertContains(response, '<option value="2023"  selected >2023</option>', html=False)
+        self.assertContains(response, '<option value="2024" >2024</option>', html=False)
+
+        course = Course.objects.get(class_id='101')
+        course.course_name = '情報処理コース'
+        course.save()
+        Subject.objects.create(subject_id='A02', subject_name='英語')
+        response = self.client.post(url, data)
+        self.assertContains(response, '101情報処理コース')
+        self.assertContains(response, 'A02,英語')
+
+    def test_select_fragments_follow_changes_in_other_workers(self):
+        """共有キャッシュでは、他のワーカーでのクラスの更新後に、断片キャッシュの選択肢も新しくなること"""
+        location = tempfile.mkdtemp(prefix='studentapp-cache-')
+        with override_settings(CACHES={
+            **settings.CACHES,
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        }):
+            self.client.force_login(self.teacher)
+            url = reverse('scores:score_list')
+            self.client.post(url, {'year': '2024', 'class': '101', 'subject': 'A01'})
+
+            # 他のワーカーでクラスを登録した（このプロセスではシグナルを受け取らない）
+            Course.objects.bulk_create([Course(class_id='102', course_name='情報処理コース')])
+            FileBasedCache(location, {}).incr(version_key(Course))
+
+            response = self.client.post(url, {'year': '2024', 'class': '101', 'subject': 'A01'})
+            self.assertContains(response, '102情報処理コース')
@@ -7,7 +7,9 @@ urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
     path('top/', views.IndexView.as_view(), name='index'),
     path('student_list/', views.student_listView, name='stu_list'),
+    path('student_export/', views.StudentExportView, name='stu_export'),
     path('student_create/', views.StudentCreateView.as_view(), name='stu_create'),
+    path('student_import/', views.StudentImportView, name='stu_import'),
     path('student_detail/', views.StudentDetailView, name='stu_detail'),
     path('student_update/', views.StudentUpdateView, name='stu_update'),
     # path('student_update_execute/<str:pk>/', views.StudentUpdateExecuteView.as_view(), name='stu_update'),
@@ -1,13 +1,21 @@
 from django.views import generic
-from .models import Student, Course
+from .conditional import conditional_page
+from .models import Course, Student, allocate_student_ids
 from django.shortcuts import redirect, render
 from .forms import StudentCreateForm
+from .exports import EXPORT_CHUNK_SIZE, csv_streaming_response
+from .reference import ent_year_choices, get_courses
+from .imports import IMPORT_ENCODINGS, IMPORTERS, read_csv
+from .params import BadParameter, int_param
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.urls import reverse
 
+# 学生一覧の1ページあたりの表示件数
+STUDENT_LIST_PAGE_SIZE = 50
+
 # Create your views here.
 class HomeView(generic.TemplateView):
     template_name = "students/home.html"
@@ -28,28 +36,155 @@ class IndexView(LoginRequiredMixin, generic.TemplateView):
     template_name = 'students/index.html'
 
 @login_required
+@conditional_page(Student, Course)
 def student_listView(request):
     """
     学生一覧を表示するビュー
 
+    学生番号をキーにしたキーセットページネーションで、1ページ分の学生だけを取得します。
+    一覧に表示する列だけを `only()` で取得し、クラスは `select_related` で結合するため、
+    何ページ目でも学生数に関係なく同じコストで表示できます。
+    学生・クラスが更新されるまでは、ブラウザの再検証（If-None-Match）に 304 を返します。
+
     引数:
         request (HttpRequest): HTTPリクエストオブジェクト
+            GETパラメータ:
+                - year: 入学年度で絞り込み（任意）
+                - class: クラス番号で絞り込み（任意）
+                - after: この学生番号より後のページを表示（次へ）
+                - before: この学生番号より前のページを表示（前へ）
     戻り値:
         render: 表示する学生一覧情報をstudents_list.htmlへ送る
     使用例:
         student_listView(request)
     """
-    students = Student.objects.all().filter(attend_flag=True).order_by('student_id')
-    context = {'students': students,}
+    try:
+        select_year = int_param(request.GET, 'year')
+    except BadParameter as e:
+        return e.response()
+    select_class = request.GET.get('class', '')
+    after = request.GET.get('after', '')
+    before = request.GET.get('before', '')
+
+    students = Student.objects.filter(attend_flag=True).select_related('class_id').only(
+        'student_id', 'last_name', 'first_name', 'ent_year', 'absence_day',
+        'class_id__class_id', 'class_id__course_name',
+    )
+    if select_year:
+        students = students.filter(ent_year=select_year)
+    if select_class:
+        students = students.filter(class_id=select_class)
+
+    # 1件多く取得して、前後のページの有無を判定する
+    if before:
+        page = list(students.filter(student_id__lt=before).order_by('-student_id')[:STUDENT_LIST_PAGE_SIZE + 1])
+        has_prev = len(page) > STUDENT_LIST_PAGE_SIZE
+        page = page[:STUDENT_LIST_PAGE_SIZE][::-1]
+        has_next = True
+    else:
+        if after:
+            students = students.filter(student_id__gt=after)
+        page = list(students.order_by('student_id')[:STUDENT_LIST_PAGE_SIZE + 1])
+        has_next = len(page) > STUDENT_LIST_PAGE_SIZE
+        page = page[:STUDENT_LIST_PAGE_SIZE]
+        has_prev = bool(after)
+
+    # 選択肢はテンプレートの断片キャッシュがない場合だけ取得するよう、関数のまま渡す
+    context = {
+        'students': page,
+        'course_all': get_courses,
+        'ent_year': ent_year_choices(),
+        'select_year': select_year,
+        'select_class': select_class,
+        'next_after': page[-1].student_id if page and has_next else '',
+        'prev_before': page[0].student_id if page and has_prev else '',
+    }
     return render(request, 'students/students_list.html', context)
 
 
+@login_required
+def StudentExportView(request):
+    """
+    学生一覧をCSVで出力するビュー
+
+    学生一覧画面と同じ条件（入学年度・クラス）で絞り込んだ在籍中の学生を、
+    `values_list(...).iterator()` で少しずつ取得しながらストリーミングで出力します。
+
+    引数:
+        request (HttpRequest): HTTPリクエストオブジェクト
+            GETパラメータ:
+                - year: 入学年度で絞り込み（任意）
+                - class: クラス番号で絞り込み（任意）
+                - encoding: 'utf-8'（BOM付き、既定）または 'cp932'
+    戻り値:
+        StreamingHttpResponse: 学生一覧のCSV
+    """
+    try:
+        select_year = int_param(request.GET, 'year')
+    except BadParameter as e:
+        return e.response()
+
+    students = Student.objects.filter(attend_flag=True)
+    if select_year:
+        students = students.filter(ent_year=select_year)
+    if request.GET.get('class'):
+        students = students.filter(class_id=request.GET.get('class'))
+
+    rows = students.order_by('student_id').values_list(
+        'student_id', 'last_name', 'first_name', 'ent_year', 'class_id', 'class_id__course_name', 'absence_day',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    header = ['学生番号', '氏名', '名前', '入学年度', 'クラス番号', 'クラス名', '欠席累計']
+    return csv_streaming_response('students.csv', header, rows, request.GET.get('encoding', 'utf-8'))
+
+
+@login_required
+def StudentImportView(request):
+    """
+    CSVファイルから学生・点数・出欠席をまとめて登録するビュー
+
+    アップロードされたCSVをバッチ単位で検証し、正しい行だけを1つのトランザクション内で一括登録します。
+    エラーのあった行は、行番号とエラー内容を画面に表示します。
+
+    引数:
+        request (HttpRequest): HTTPリクエストオブジェクト
+            POSTパラメータ:
+                - import_type: 'students'、'scores'、'attendance' のいずれか
+                - csv_file: 取り込むCSVファイル
+                - encoding: 'utf-8'（既定）または 'cp932'
+                - dry_run: 指定した場合は検証のみ行い、登録しない
+    戻り値:
+        render: 取込結果をstudent_import.htmlへ送る
+    """
+    result = None
+    import_type = request.POST.get('import_type', 'students')
+    encoding = request.POST.get('encoding', 'utf-8')
+    if request.method == 'POST' and encoding not in IMPORT_ENCODINGS:
+        messages.error(request, "文字コードは UTF-8 または Shift_JIS を指定してください。")
+    elif request.method == 'POST' and request.FILES.get('csv_file') and import_type in IMPORTERS:
+        dry_run = bool(request.POST.get('dry_run'))
+        rows = read_csv(request.FILES['csv_file'].file, encoding)
+        try:
+            result = IMPORTERS[import_type](rows, dry_run=dry_run)
+        except UnicodeDecodeError:
+            messages.error(request, "CSVファイルの文字コードが正しくありません。")
+        else:
+            if dry_run:
+                messages.info(request, f"検証のみ行いました。（登録可能 {result.created}件、エラー {len(result.errors)}件）")
+            else:
+                messages.success(request, f"CSVを取り込みました。（登録 {result.created}件、エラー {len(result.errors)}件）")
+    context = {
+        'result': result,
+        'import_type': import_type,
+    }
+    return render(request, 'students/student_import.html', context)
+
+
 class StudentCreateView(LoginRequiredMixin, generic.CreateView):
     """
     新しい学生情報をデータベースに登録するためのビュー。
 
     このビューは、新しい学生のレコードをフォームを使用して作成します。
-    学生IDは、既存の学生IDの中で最も高い値を基にして、1を加算し、10桁の形式で学生IDを生成します。
+    学生IDは、データベースのシーケンスから採番し、10桁の形式で学生IDを生成します。
     学生情報が正常に保存された後、成功ページにリダイレクトし、成功メッセージが表示されます。
 
     属性:
@@ -78,7 +213,7 @@ class StudentCreateView(LoginRequiredMixin, generic.CreateView):
         フォームが有効な場合に呼び出されるメソッド。
 
         このメソッドは、フォームの送信が成功した場合に呼ばれます。
-        最新の学生IDを取得し、それに1を加算して新しい学生IDを生成します。
+        シーケンスから新しい学生IDを採番します（同時に登録しても重複しません）。
         この新しいIDを使用して学生を保存します。
 
         引数:
@@ -90,17 +225,11 @@ class StudentCreateView(LoginRequiredMixin, generic.CreateView):
             'form': form,
         }
         if self.request.POST.get('next', '') == 'create':
-            stu_id = ''
-            latest_stu = Student.objects.order_by('-student_id').only('student_id').first()
-            if latest_stu is None or latest_stu.student_id is None:
-                stu_id = '0000000001'
-            else:
-                int_stu_id = int(latest_stu.student_id) + 1
-                str_stu_id = str(int_stu_id).zfill(10)
-                stu_id = str_stu_id
+            stu_id, = allocate_student_ids()
             student = form.save(commit=False)
             student.student_id = stu_id
-            student.save()
+            # 払い出した番号は未使用のため、UPDATEを試さずにINSERTする
+            student.save(force_insert=True)
             messages.success(self.request, "学生情報を登録しました。")
             return redirect('students:stu_create')
 
@@ -111,7 +240,7 @@ def StudentDetailView(request):
         student_pk = request.GET.get('student_pk')
     elif request.POST:
         student_pk = request.POST.get('student_pk')
-    student_data = Student.objects.filter(student_id=student_pk).first()
+    student_data = Student.objects.filter(student_id=student_pk).select_related('class_id').first()
     context = {
         'stu_data': student_data,
     }